@@ -45,9 +45,12 @@ CREATE TABLE IF NOT EXISTS place (
     longitude FLOAT CHECK (-180 <= longitude AND longitude <= 180) NOT NULL,
     owner_id VARCHAR(36) NOT NULL,
     rating DECIMAL(10, 1) CHECK (rating >= 0 AND rating <= 5),
+    rating_sum FLOAT DEFAULT 0 NOT NULL,
+    review_count INTEGER DEFAULT 0 NOT NULL,
     created_at DATETIME DEFAULT CURRENT_TIMESTAMP NOT NULL,
     updated_at DATETIME DEFAULT CURRENT_TIMESTAMP NOT NULL,
     photos_url TEXT DEFAULT '[]' NOT NULL,
+    photos_status VARCHAR(16) DEFAULT 'checked' NOT NULL,
     FOREIGN KEY (owner_id) REFERENCES user(id) ON DELETE CASCADE
 );
 
@@ -118,3 +121,16 @@ INSERT INTO user (
 		'36c9050e-ddd3-4c3b-9731-9f487208bbc1', 'Test', 'User', 'tu@mail.com',
 		'$argon2id$v=19$m=62500,t=2,p=2$0tnvcK7OXJghDSOlMeu19A$v+q44IHr2ctzwfdYn57g/U8VjNkBKnNb', 'True', 'True', '2025-06-30 14:43:50.268972',
 		'2025-06-30 14:43:50.268972');
+
+-- Indexes for the most frequent lookups
+CREATE INDEX IF NOT EXISTS ix_amenity_name ON amenity (name);
+CREATE INDEX IF NOT EXISTS ix_reviews_place_created_at_id
+    ON reviews (place, created_at, id);
+CREATE UNIQUE INDEX IF NOT EXISTS uq_reviews_booking ON reviews (booking);
+CREATE INDEX IF NOT EXISTS ix_place_owner_id ON place (owner_id);
+CREATE INDEX IF NOT EXISTS ix_place_price ON place (price);
+CREATE INDEX IF NOT EXISTS ix_place_rating ON place (rating);
+CREATE INDEX IF NOT EXISTS ix_place_latitude_longitude
+    ON place (latitude, longitude);
+CREATE INDEX IF NOT EXISTS ix_place_photos_pending ON place (photos_status)
+    WHERE photos_status = 'pending';
@@ -4,16 +4,25 @@ This module provides the initialization file for
 the Flask server and JWT management.
 '''
 from flask import Flask, redirect, render_template, send_from_directory
+from flask import request
 from flask_restx import Api
 from config import config
-from utils import purge_expired_tokens
 from extensions import db, jwt
-from app.models.user import RevokedToken
-from utils import purge_expired_tokens, delete_invalid_amenities
+from blacklist import revoked_tokens
+from image_validator import image_validator
+from geocoder import geocoder
+from utils import delete_invalid_amenities
+from utils import ensure_indexes, explain_hot_queries
+from utils import ensure_columns, backfill_place_ratings
+from utils import ensure_spatial_index, ensure_search_index
 from flask_cors import CORS
 from app.api.v1.routes.places import place_pages
 from app.api.v1.routes.auth import auth_pages
 from app.services import facade
+from app.persistence.repository import begin_unit_of_work
+from app.persistence.repository import end_unit_of_work
+from app.persistence.query_stats import init_query_stats
+from app.services.jobs import init_scheduler
 import os
 
 
@@ -36,26 +45,77 @@ def create_app(config_name='default'):
 
     db.init_app(app)
     jwt.init_app(app)
+    facade.init_app(app)
+    image_validator.init_app(app)
+    geocoder.init_app(app)
+    revoked_tokens.refresh_interval = app.config[
+        'REVOKED_TOKENS_REFRESH_INTERVAL']
+    init_query_stats(app)
 
     @jwt.token_in_blocklist_loader
     def check_if_blacklist(jwt_header, jwt_payload):
         """
-        This methods will iterate the revoked tokens when a user logout.
+        Tell if the token was revoked by a logout, from the in-memory
+        copy of the revoked tokens.
         """
-        jti = jwt_payload["jti"]
-        token = db.session.get(RevokedToken, jti)
-        return token is not None
+        return revoked_tokens.is_revoked(jwt_payload["jti"])
+
+    @app.before_request
+    def open_unit_of_work():
+        """
+        Stage every write of a mutating request in a single transaction.
+        """
+        if request.method in ('POST', 'PUT', 'PATCH', 'DELETE'):
+            begin_unit_of_work()
+
+    @app.after_request
+    def close_unit_of_work(response):
+        """
+        Commit the staged writes once, or roll them back if the request
+        ended with an error.
+        """
+        end_unit_of_work(success=response.status_code < 400)
+        return response
+
+    @app.teardown_request
+    def discard_unit_of_work(exc):
+        """
+        Roll back a unit of work left open by an unhandled exception.
+        """
+        end_unit_of_work(success=False)
 
     with app.app_context():
+        new_availability = not db.inspect(db.engine).has_table('availability')
         db.create_all()
-        purge_expired_tokens()
+        if new_availability:
+            facade.rebuild_availability()
+        if ('place', 'review_count') in ensure_columns():
+            backfill_place_ratings()
+        ensure_indexes()
+        app.config['SPATIAL_INDEX'] = ensure_spatial_index()
+        app.config['SEARCH_INDEX'] = ensure_search_index()
         delete_invalid_amenities()
+    init_scheduler(app)
+
+    @app.cli.command('check-indexes')
+    def check_indexes():
+        """
+        Print the query plan of the hot queries and fail if one of them
+        scans a whole table.
+        """
+        report = explain_hot_queries()
+        for name, result in report.items():
+            status = 'OK  ' if result['uses_index'] else 'SCAN'
+            print(f"{status} {name}: {' | '.join(result['plan'])}")
+        if not all(result['uses_index'] for result in report.values()):
+            raise SystemExit(1)
 
     from app.api.v1.users import api as users_ns
     from app.api.v1.amenities import api as amenities_ns
     from app.api.v1.places import api as places_ns
     from app.api.v1.reviews import api as reviews_ns
     from app.api.v1.bookings import api as bookings_ns
+    from app.api.v1.stats import api as stats_ns
 
     @app.errorhandler(404)
     def page_not_found(e):
@@ -87,6 +147,7 @@ def create_app(config_name='default'):
     api.add_namespace(places_ns, path='/api/v1/places')
     api.add_namespace(reviews_ns, path='/api/v1/reviews')
     api.add_namespace(bookings_ns, path='/api/v1/bookings')
+    api.add_namespace(stats_ns, path='/api/v1/stats')
 
     app.register_blueprint(place_pages)
     app.register_blueprint(auth_pages)
@@ -8,6 +8,10 @@ from flask import request
 from app.services import facade
 from app.models.booking import CreateBooking, BookingPublic, BookingStatus
 from app.models.booking import UpdateBooking
+from app.api.v1.pagination import get_page_args, page_headers, page_params
+from app.api.v1.pagination import DEFAULT_PAGE_SIZE
+from app.persistence.query_stats import query_budget
+from app.api.v1.idempotency import idempotent, idempotency_params
 from pydantic import ValidationError
 from flask_jwt_extended import jwt_required, get_jwt_identity
 import uuid
@@ -42,35 +46,50 @@ def ensure_aware(dt):
 @api.route('/')
 class BookingList(Resource):
     @jwt_required()
-    @api.response(200, 'List of bookings retrieved successfully')
+    @api.doc(params=page_params)
+    @api.response(200, 'List of bookings retrieved successfully', headers={
+        'X-Next-Cursor': 'Cursor of the next page, absent on the last page'
+    })
+    @api.response(400, 'Invalid pagination parameters')
     @api.response(401, 'Unauthorized')
     @api.response(403, 'Forbidden')
     def get(self):
-        """Retrieve a list of all bookings"""
+        """
+        Retrieve a page of the bookings.
+        Pages hold 20 bookings unless a limit is given; the
+        next one is requested with the X-Next-Cursor of the response.
+        """
         current_user_id = get_jwt_identity()
         current_user = facade.get_user(current_user_id)
         if (current_user.is_admin is False):
             return {'error': "Only an admin can view these informations"}, 403
-        bookings = facade.get_all_bookings()
+        try:
+            limit, cursor = get_page_args()
+            bookings, next_cursor = facade.get_bookings_page(
+                limit or DEFAULT_PAGE_SIZE, cursor)
+        except ValueError as e:
+            return {'error': str(e)}, 400
         if not bookings:
             return {"message": "No booking yet"}, 200
 
         booking_list = []
         for booking in bookings:
-            facade.manage_bookingstatus(booking.id)
             booking_list.append(BookingPublic.model_validate(
                 booking).model_dump(mode='json'))
 
-        return booking_list, 200
+        return booking_list, 200, page_headers(next_cursor)
 
 
 @api.route('/<place_id>')
 class BookingCreate(Resource):
     @jwt_required()
+    @idempotent
+    @api.doc(params=idempotency_params)
     @api.expect(booking_model, validate=True)
     @api.response(201, 'Booking succesfully created')
     @api.response(400, 'Invalid input data')
     @api.response(401, 'Unauthorized')
+    @api.response(422, 'Idempotency-Key reused for a different request')
     def post(self, place_id):
         """Create a new booking"""
         user_id = get_jwt_identity()
@@ -84,20 +103,15 @@ class BookingCreate(Resource):
         except ValueError as e:
             return {'error': str(e)}, 400
 
-        booking_list = facade.get_pending_booking_list_by_place(place_id)
-        for booking in booking_list:
-            booking_start = ensure_aware(booking.start_date)
-            booking_end = ensure_aware(booking.end_date)
-            new_start = ensure_aware(booking_data.start_date)
-            new_end = ensure_aware(booking_data.end_date)
-
-            if booking_start < new_end and new_start < booking_end:
-                return {'error': 'Already booked'}, 400
         now = datetime.now(timezone.utc)
-        if booking_data.start_date < now:
+        if ensure_aware(booking_data.start_date) < now:
             return {'error': 'Cannot create a booking in the past'}, 400
 
-        new_booking = facade.create_booking(user_id, place_id, booking_data)
+        try:
+            new_booking = facade.create_booking(user_id, place_id,
+                                                booking_data)
+        except ValueError as e:
+            return {'error': str(e)}, 400
 
         return (BookingPublic.model_validate(
             new_booking).model_dump(mode='json')), 201
@@ -133,8 +147,6 @@ class BookingResource(Resource):
             return {'error': "Only an admin, the place owner or the visitor "
                     "can view these informations"}, 403
 
-        facade.manage_bookingstatus(booking_id)
-
         return (BookingPublic.model_validate(
             booking).model_dump(mode='json')), 200
 
@@ -219,7 +231,6 @@ class PlaceBookingList(Resource):
 
         booking_list = []
         for booking in bookings:
-            facade.manage_bookingstatus(booking.id)
             booking_list.append(BookingPublic.model_validate(
                 booking).model_dump(mode='json'))
 
@@ -248,7 +259,6 @@ class PlaceBookingList(Resource):
 
         booking_list = []
         for booking in bookings:
-            facade.manage_bookingstatus(booking.id)
             booking_list.append(BookingPublic.model_validate(booking)
                                     .model_dump(mode='json'))
         return booking_list, 200
@@ -276,8 +286,33 @@ class UserBookingList(Resource):
 
         booking_list = []
         for booking in bookings:
-            facade.manage_bookingstatus(booking.id)
             booking_list.append(BookingPublic.model_validate(
                 booking).model_dump(mode='json'))
 
         return booking_list, 200
+
+
+@api.route('/owner/pending')
+class OwnerPendingBookingList(Resource):
+    @jwt_required()
+    @api.doc(params=page_params)
+    @api.response(200, 'Pending bookings of the owned places retrieved')
+    @api.response(400, 'Invalid pagination parameters')
+    @api.response(401, 'Unauthorized')
+    @query_budget(2)
+    def get(self):
+        """Get the pending bookings of all the places of the current user"""
+        current_user_id = get_jwt_identity()
+        try:
+            limit, cursor = get_page_args()
+            bookings, next_cursor = facade.get_owner_pending_bookings_page(
+                current_user_id, limit or DEFAULT_PAGE_SIZE, cursor)
+        except ValueError as e:
+            return {'error': str(e)}, 400
+
+        booking_list = []
+        for booking in bookings:
+            booking_list.append(BookingPublic.model_validate(
+                booking).model_dump(mode='json'))
+
+        return booking_list, 200, page_headers(next_cursor)
@@ -0,0 +1,87 @@
+"""
+This module contains the Idempotency-Key support of the creation
+endpoints. A request retried with the same key gets the response of the
+first one back, without running the endpoint again.
+"""
+from flask import request
+from flask_jwt_extended import get_jwt_identity
+from functools import wraps
+from sqlalchemy.exc import IntegrityError
+from app.services import facade
+from extensions import db
+import hashlib
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 255
+
+idempotency_params = {
+    IDEMPOTENCY_HEADER: {
+        'in': 'header',
+        'description': 'Unique value chosen by the client for this request. '
+                       'Retries with the same value get the first response '
+                       'back instead of running the request again.'
+    }
+}
+
+
+def request_fingerprint():
+    """
+    Hash the method, path and body of the current request.
+    """
+    digest = hashlib.sha256()
+    digest.update(f"{request.method} {request.path}\n".encode())
+    digest.update(request.get_data())
+    return digest.hexdigest()
+
+
+def replay(stored, fingerprint):
+    """
+    Answer a retried request with the stored response.
+    """
+    if stored.fingerprint != fingerprint:
+        return {'error': f"{IDEMPOTENCY_HEADER} already used for a "
+                "different request"}, 422
+    return stored.response, stored.status_code, {
+        'Idempotent-Replayed': 'true'}
+
+
+def idempotent(func):
+    """
+    Serve the requests sent with an Idempotency-Key header once per user
+    and key. Only successful responses are stored: a failed request can
+    be retried with the same key. Must be applied under jwt_required.
+    """
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        key = request.headers.get(IDEMPOTENCY_HEADER)
+        if key is None:
+            return func(*args, **kwargs)
+        if not key.strip() or len(key) > MAX_KEY_LENGTH:
+            return {'error': f"{IDEMPOTENCY_HEADER} must be 1 to "
+                    f"{MAX_KEY_LENGTH} characters long"}, 400
+
+        user_id = get_jwt_identity()
+        fingerprint = request_fingerprint()
+        stored = facade.get_idempotency_key(user_id, key)
+        if stored is not None:
+            return replay(stored, fingerprint)
+        try:
+            stored = facade.reserve_idempotency_key(user_id, key,
+                                                    fingerprint)
+        except IntegrityError:
+            # A concurrent request with the same key committed first
+            db.session.rollback()
+            stored = facade.get_idempotency_key(user_id, key)
+            if stored is None:
+                return {'error': f"A request with this {IDEMPOTENCY_HEADER}"
+                        " is already in progress"}, 409
+            return replay(stored, fingerprint)
+
+        result = func(*args, **kwargs)
+        if not isinstance(result, tuple):
+            result = (result, 200)
+        body, status_code = result[0], result[1]
+        if status_code < 400:
+            facade.store_idempotent_response(stored, status_code, body)
+        return result
+    return wrapper
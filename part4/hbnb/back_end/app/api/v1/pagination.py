@@ -0,0 +1,48 @@
+"""
+This module contains the helpers shared by the paginated list endpoints.
+Pages are requested with the 'limit' and 'cursor' query parameters and
+the cursor of the next page is returned in the X-Next-Cursor header.
+"""
+from flask import request
+
+# Largest page a client can ask for
+MAX_PAGE_SIZE = 100
+# Page size of the endpoints that are always paginated
+DEFAULT_PAGE_SIZE = 20
+
+page_params = {
+    'limit': f'Number of items per page (1-{MAX_PAGE_SIZE}), '
+             'enables pagination',
+    'cursor': 'Cursor returned in the X-Next-Cursor header of the '
+              'previous page'
+}
+
+
+def get_page_args():
+    """
+    Read the pagination arguments of the current request.
+    Returns (limit, cursor), or (None, None) when the client did not ask
+    for a page. Raises ValueError on an invalid limit.
+    """
+    limit = request.args.get('limit')
+    cursor = request.args.get('cursor')
+    if limit is None and cursor is None:
+        return None, None
+    if limit is None:
+        return MAX_PAGE_SIZE, cursor
+    try:
+        limit = int(limit)
+    except ValueError:
+        raise ValueError("limit must be an integer")
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        raise ValueError(f"limit must be between 1 and {MAX_PAGE_SIZE}")
+    return limit, cursor
+
+
+def page_headers(next_cursor):
+    """
+    Build the response headers announcing the next page.
+    """
+    if next_cursor is None:
+        return {}
+    return {'X-Next-Cursor': next_cursor}
@@ -7,7 +7,12 @@ from flask_restx import Namespace, Resource, fields
 from flask import request, Blueprint, render_template, abort
 from app.services import facade
 from pydantic import ValidationError, AnyUrl
-from app.models.place import PlacePublic, PlaceUpdate, PlaceCreate
+from app.models.place import PlacePublic, PlaceUpdate
+from app.models.place import PlaceFilter, PlaceNearby, PlaceAvailableFilter
+from app.models.availability import AvailabilityQuery
+from app.api.v1.pagination import get_page_args, page_headers, page_params
+from app.api.v1.pagination import DEFAULT_PAGE_SIZE
+from app.persistence.query_stats import query_budget
 from uuid import UUID
 from flask_jwt_extended import jwt_required, get_jwt_identity
 import json
@@ -49,6 +54,14 @@ place_model_update = api.model('PlaceUpdate', {
                               description='List of photos for the place')
 })
 
+place_filter_params = {
+    'min_price': 'Lowest price per night',
+    'max_price': 'Highest price per night',
+    'min_rating': 'Lowest average rating',
+    'amenity_ids': 'Comma separated amenity IDs the place must all have',
+    'bbox': "Bounding box as 'south,west,north,east' in degrees"
+}
+
 
 @api.route('/')
 class PlaceList(Resource):
@@ -84,12 +97,29 @@ class PlaceList(Resource):
 
         return response_data, 201
 
-    @api.doc(security=[])
-    @api.response(200, 'Places found')
+    @api.doc(security=[], params={**place_filter_params, **page_params})
+    @api.response(200, 'Places found', headers={
+        'X-Next-Cursor': 'Cursor of the next page, absent on the last page'
+    })
+    @api.response(400, 'Invalid filter or pagination parameters')
     @api.response(404, 'No places found')
+    @query_budget(3)
     def get(self):
-        """Get a list of all places"""
-        places = facade.place_repo.get_all()
+        """
+        Get a page of the places, optionally filtered.
+        Pages hold 20 places unless a limit is given; the
+        next one is requested with the X-Next-Cursor of the response.
+        """
+        try:
+            filters = PlaceFilter.model_validate(request.args.to_dict())
+        except ValidationError as e:
+            return {'error': json.loads(e.json())}, 400
+        try:
+            limit, cursor = get_page_args()
+            places, next_cursor = facade.filter_places(
+                filters, limit or DEFAULT_PAGE_SIZE, cursor)
+        except ValueError as e:
+            return {'error': str(e)}, 400
 
         if not places:
             return {'message': 'No places found'}, 404
@@ -101,15 +131,145 @@ class PlaceList(Resource):
                 place_data['photos_url'] = [str(url) for url in place_data['photos_url']]
             results.append(place_data)
 
+        return results, 200, page_headers(next_cursor)
+
+
+@api.route('/available')
+class PlaceAvailableList(Resource):
+    @api.doc(security=[], params={
+        'start_date': 'Arrival date of the stay',
+        'end_date': 'Departure date of the stay',
+        **place_filter_params, **page_params
+    })
+    @api.response(200, 'Places free for the stay')
+    @api.response(400, 'Invalid dates, filter or pagination parameters')
+    @query_budget(3)
+    def get(self):
+        """Get the places with no booking during a stay"""
+        try:
+            filters = PlaceAvailableFilter.model_validate(
+                request.args.to_dict())
+        except ValidationError as e:
+            return {'error': json.loads(e.json())}, 400
+        try:
+            limit, cursor = get_page_args()
+            places, next_cursor = facade.get_available_places(
+                filters, limit or DEFAULT_PAGE_SIZE, cursor)
+        except ValueError as e:
+            return {'error': str(e)}, 400
+
+        results = []
+        for place in places:
+            place_data = PlacePublic.model_validate(place).model_dump()
+            if place_data.get('photos_url') is not None:
+                place_data['photos_url'] = [str(url) for url in
+                                            place_data['photos_url']]
+            results.append(place_data)
+
+        return results, 200, page_headers(next_cursor)
+
+
+@api.route('/nearby')
+class PlaceNearbyList(Resource):
+    @api.doc(security=[], params={
+        'lat': 'Latitude of the search center',
+        'lon': 'Longitude of the search center',
+        'radius_km': 'Search radius in kilometers (default 10, max 500)',
+        'limit': 'Maximum number of places (default 20, max 100)'
+    })
+    @api.response(200, 'Places found, closest first')
+    @api.response(400, 'Invalid input')
+    @query_budget(4)
+    def get(self):
+        """Get the places around a point, sorted by distance"""
+        try:
+            search = PlaceNearby.model_validate(request.args.to_dict())
+        except ValidationError as e:
+            return {'error': json.loads(e.json())}, 400
+
+        results = []
+        for place, distance in facade.get_places_nearby(
+                search.lat, search.lon, search.radius_km, search.limit):
+            place_data = PlacePublic.model_validate(place).model_dump()
+            if place_data.get('photos_url') is not None:
+                place_data['photos_url'] = [str(url) for url in
+                                            place_data['photos_url']]
+            place_data['distance_km'] = round(distance, 3)
+            results.append(place_data)
+
         return results, 200
 
 
+@api.route('/search')
+class PlaceSearch(Resource):
+    @api.doc(security=[], params={'q': 'Words to search in the title and '
+                                       'description of the places',
+                                  **page_params})
+    @api.response(200, 'Places found, best matches first')
+    @api.response(400, 'Invalid input')
+    @query_budget(3)
+    def get(self):
+        """Search the places by title and description"""
+        try:
+            limit, cursor = get_page_args()
+            places, next_cursor = facade.search_places(
+                request.args.get('q', ''), limit or DEFAULT_PAGE_SIZE, cursor)
+        except ValueError as e:
+            return {'error': str(e)}, 400
+
+        results = []
+        for place in places:
+            place_data = PlacePublic.model_validate(place).model_dump()
+            if place_data.get('photos_url') is not None:
+                place_data['photos_url'] = [str(url) for url in
+                                            place_data['photos_url']]
+            results.append(place_data)
+
+        return results, 200, page_headers(next_cursor)
+
+
+@api.route('/<place_id>/availability')
+class PlaceAvailability(Resource):
+    @api.doc(security=[], params={
+        'from': 'First day of the calendar, YYYY-MM-DD (default today)',
+        'to': 'Day after the last day of the calendar, YYYY-MM-DD '
+              '(default from + 90 days, at most 731 days)'
+    })
+    @api.response(200, 'Availability calendar of the place')
+    @api.response(400, 'Invalid UUID format or dates')
+    @api.response(404, 'Place not found')
+    @query_budget(2)
+    def get(self, place_id):
+        """Get the taken days of a place between two dates"""
+        try:
+            UUID(place_id)
+            days = AvailabilityQuery.model_validate(request.args.to_dict())
+        except ValidationError as e:
+            return {'error': json.loads(e.json())}, 400
+        except ValueError:
+            return {'error': 'invalid UUID format'}, 400
+
+        if not facade.get_place(place_id):
+            return {'error': 'Place not found'}, 404
+
+        booked = facade.get_booked_days(place_id, days.from_date,
+                                        days.to_date)
+        return {
+            'place_id': place_id,
+            'from': days.from_date.isoformat(),
+            'to': days.to_date.isoformat(),
+            'available': not booked,
+            'booked_days': [day.isoformat() for day in booked]
+        }, 200
+
+
 @api.route('/<place_id>')
 class PlaceResource(Resource):
     @api.doc(security=[])
     @api.response(200, 'Place(s) found')
     @api.response(400, 'Invalid UUID format')
     @api.response(404, 'Place not found')
+    @query_budget(3)
     def get(self, place_id):
         """Get a place by ID"""
         if place_id:
@@ -162,8 +322,10 @@ class PlaceResource(Resource):
             return {'error': 'You must own this place to modify it'}, 403
 
         try:
-            update_data = (PlaceUpdate.model_validate(request.json)
-                           .model_dump(exclude_unset=True))
+            update_data = (PlaceUpdate.model_validate(request.json, context={
+                'trusted_photos': existing_place.photos_url,
+                'defer_photos': facade.defer_photo_checks
+            }).model_dump(exclude_unset=True))
         except ValidationError as e:
             return {'error': json.loads(e.json())}, 400
         try:
@@ -180,18 +342,6 @@ class PlaceResource(Resource):
                 'name': amenity.name,
                 'description': amenity.description
             })
-        try:
-            photos_url = updated_place.photos_url
-            if photos_url is None:
-                photos_url = []
-
-            if photos_url:
-                if not PlaceCreate.validate_image(photos_url):
-                    return {'message': 'L\'URL ne pointe pas vers une image valide'}, 400
-
-        except ValidationError as e:
-            return {'error': json.loads(e.json())}, 400
-
         response_data = PlacePublic.model_validate(updated_place).model_dump()
 
         if 'photos_url' in response_data and response_data['photos_url'] is not None:
@@ -10,6 +10,10 @@ from pydantic import ValidationError
 from uuid import UUID
 from app.models.review import ReviewCreate, ReviewPublic, ReviewUpdate
 from flask_jwt_extended import jwt_required, get_jwt_identity
+from app.api.v1.pagination import get_page_args, page_headers, page_params
+from app.api.v1.pagination import DEFAULT_PAGE_SIZE
+from app.persistence.query_stats import query_budget
+from app.api.v1.idempotency import idempotent, idempotency_params
 import json
 
 api = Namespace('reviews', description='Review operations')
@@ -41,12 +45,15 @@ class ReviewList(Resource):
 @api.route('/from_booking/<booking_id>')
 class CreateReview(Resource):
     @jwt_required()
+    @idempotent
+    @api.doc(params=idempotency_params)
     @api.expect(review_model)
     @api.response(201, 'Review successfully created')
     @api.response(400, 'Invalid input data')
     @api.response(401, 'Unauthorized')
     @api.response(403, 'Permission error')
     @api.response(404, 'Place not found')
+    @api.response(422, 'Idempotency-Key reused for a different request')
     def post(self, booking_id):
         """Register a new review"""
         current_user_id = get_jwt_identity()
@@ -85,8 +92,6 @@ class CreateReview(Resource):
         except ValueError as e:
             return {"error": str(e)}, 400
 
-        place.update_average_rating()
-        facade.place_repo.update(place.id, {"rating": place.rating})
         return ReviewPublic.model_validate(new_review).model_dump(), 201
 
 
@@ -139,16 +144,12 @@ class ReviewResource(Resource):
                            .model_dump(exclude_unset=True))
         except ValidationError as e:
             return {'error': json.loads(e.json())}, 400
-        place_id = review.place
 
         try:
             updated_review = facade.update_review(review_id, update_data)
         except ValidationError as e:
             return {'error': json.loads(e.json())}, 400
 
-        place = facade.place_repo.get(place_id)
-        place.update_average_rating()
-        facade.place_repo.update(place.id, {"rating": place.rating})
         return ReviewPublic.model_validate(updated_review).model_dump(), 200
 
     @jwt_required()
@@ -181,12 +182,19 @@ class ReviewResource(Resource):
 
 @api.route('/places/<place_id>/reviews')
 class PlaceReviewList(Resource):
-    @api.doc(security=[])
-    @api.response(200, 'List of reviews for the place retrieved successfully')
-    @api.response(400, 'Invalid UUID format')
+    @api.doc(security=[], params=page_params)
+    @api.response(200, 'List of reviews for the place retrieved successfully', headers={
+        'X-Next-Cursor': 'Cursor of the next page, absent on the last page'
+    })
+    @api.response(400, 'Invalid UUID format or pagination parameters')
     @api.response(404, 'Place not found')
+    @query_budget(3)
     def get(self, place_id):
-        """Get all reviews for a specific place"""
+        """
+        Get a page of the reviews of a place.
+        Pages hold 20 reviews unless a limit is given; the
+        next one is requested with the X-Next-Cursor of the response.
+        """
         try:
             UUID(place_id)
         except ValueError:
@@ -194,11 +202,16 @@ class PlaceReviewList(Resource):
         place = facade.get_place(place_id)
         if not place:
             return {'error': 'Place not found'}, 404
-        review_list = facade.get_reviews_by_place(place_id)
+        try:
+            limit, cursor = get_page_args()
+            review_list, next_cursor = facade.get_reviews_page_by_place(
+                place_id, limit or DEFAULT_PAGE_SIZE, cursor)
+        except ValueError as e:
+            return {'error': str(e)}, 400
         if not review_list:
             return {'message': 'No review for this place yet'}, 200
 
         return [
             ReviewPublic.model_validate(review).model_dump()
             for review in review_list
-        ], 200
+        ], 200, page_headers(next_cursor)
@@ -1,7 +1,7 @@
-from flask import Blueprint, abort, render_template, request, jsonify, current_app
+from flask import Blueprint, abort, render_template, request, jsonify
 from app.services import facade
+from geocoder import geocoder
 from uuid import UUID
-import requests
 
 place_pages = Blueprint('place_pages', __name__)
 
@@ -35,8 +35,11 @@ def booking(place_id):
 def reverse_geocode():
     """
     Endpoint to reverse geocode latitude and longitude into a location (city, etc) using OpenCage API.
+    The answers are cached for coordinates rounded to about 100 m.
     """
-    data = request.get_json()
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        data = {}
     lat = data.get("lat")
     lon = data.get("lon")
 
@@ -44,87 +47,35 @@ def reverse_geocode():
         return jsonify({"error": "Latitude and longitude required"}), 400
 
     try:
-        api_key = current_app.config['OPENCAGE_KEY']
-        response = requests.get(
-            "https://api.opencagedata.com/geocode/v1/json",
-            params={
-                "q": f"{lat},{lon}",
-                "key": api_key,
-                "language": "fr",
-                "no_annotations": 1
-            }
-        )
-        response.raise_for_status()
-        data = response.json()
-
-        if not data["results"]:
-            return jsonify({"error": "No result found"}), 404
-
-        components = data["results"][0]["components"]
-        city = components.get("city") or components.get("town") or components.get("village")
-        country = components.get("country")
-        display_name = data["results"][0]["formatted"]
-
-        return jsonify({
-            "city": city,
-            "country": country,
-            "display_name": display_name
-        })
+        lat, lon = float(lat), float(lon)
+    except (TypeError, ValueError):
+        return jsonify({"error": "Invalid latitude or longitude"}), 400
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        return jsonify({"error": "Invalid latitude or longitude"}), 400
 
+    try:
+        body, status, cache = geocoder.reverse_geocode(lat, lon)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
+    return jsonify(body), status, {'X-Cache': cache}
 
 @place_pages.route('/geocode', methods=['POST'])
 def geocode():
     """
     Endpoint to geocode a city name into latitude and longitude using OpenCage API.
     Supports multiple results for ambiguous queries.
+    The answers are cached by normalized city name.
     """
-    data = request.get_json()
-    city = data.get("city")
+    data = request.get_json(silent=True)
+    city = data.get("city") if isinstance(data, dict) else None
 
     if not city:
         return jsonify({"error": "City name required"}), 400
 
     try:
-        api_key = current_app.config['OPENCAGE_KEY']
-        response = requests.get(
-            "https://api.opencagedata.com/geocode/v1/json",
-            params={
-                "q": city,
-                "key": api_key,
-                "language": "en",
-                "no_annotations": 1,
-                "limit": 5
-            }
-        )
-        response.raise_for_status()
-        data = response.json()
-
-        if not data["results"]:
-            return jsonify({"error": "City not found"}), 404
-
-        if len(data["results"]) > 1:
-            choices = [
-                {
-                    "lat": result["geometry"]["lat"],
-                    "lon": result["geometry"]["lng"],
-                    "display_name": result["formatted"]
-                }
-                for result in data["results"]
-            ]
-            return jsonify({
-                "multiple_results": True,
-                "choices": choices
-            })
-        else:
-            geometry = data["results"][0]["geometry"]
-            return jsonify({
-                "multiple_results": False,
-                "lat": geometry["lat"],
-                "lon": geometry["lng"],
-                "display_name": data["results"][0]["formatted"]
-            })
-
+        body, status, cache = geocoder.geocode(city)
+    except TypeError:
+        return jsonify({"error": "City name must be a string"}), 400
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
\ No newline at end of file
+        return jsonify({"error": str(e)}), 500
+    return jsonify(body), status, {'X-Cache': cache}
@@ -0,0 +1,35 @@
+"""
+This module contains the API endpoint exposing the runtime counters
+of the application (caches...) to the admins.
+"""
+from flask_restx import Namespace, Resource
+from app.services import facade
+from app.services.jobs import job_stats
+from blacklist import revoked_tokens
+from image_validator import image_validator
+from geocoder import geocoder
+from flask_jwt_extended import jwt_required, get_jwt_identity
+
+api = Namespace('stats', description='Runtime statistics')
+
+
+@api.route('/')
+class Stats(Resource):
+    @jwt_required()
+    @api.response(200, 'Statistics retrieved successfully')
+    @api.response(401, 'Unauthorized')
+    @api.response(403, 'Forbidden')
+    def get(self):
+        """Retrieve the runtime statistics"""
+        current_user = facade.get_user(get_jwt_identity())
+        if not current_user or not current_user.is_admin:
+            return {'error': "Only an admin can view these informations"}, 403
+
+        return {
+            'cache': facade.cache_stats(),
+            'revoked_tokens': revoked_tokens.stats(),
+            'jobs': job_stats(),
+            'password_hashing': facade.hashing.stats(),
+            'image_validation': image_validator.stats(),
+            'geocoding': geocoder.stats(),
+        }, 200
@@ -4,19 +4,24 @@ It calls the basic business logic from the facade (/app/services/facade).
 It defines the CRUD methods for the users.
 """
 from flask_restx import Namespace, Resource, fields
-from flask import request, make_response
+from flask import request, make_response, current_app
 from app.services import facade
 from datetime import datetime
-from blacklist import blacklist
+from blacklist import revoked_tokens
 from pydantic import ValidationError, EmailStr, TypeAdapter
 from uuid import UUID
 from app.models.user import UserCreate, LoginRequest, UserUpdate
 from app.models.user import UserPublic, RevokedToken, AdminCreate
 from app.models.user import UserModeration
+from app.api.v1.pagination import get_page_args, page_headers, page_params
+from app.api.v1.pagination import DEFAULT_PAGE_SIZE
+from app.persistence.query_stats import query_budget
 from flask_jwt_extended import create_access_token, create_refresh_token
 from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
 from argon2.exceptions import VerifyMismatchError
+from app.services.hashing import HashingOverloaded
 from app import db
+from functools import wraps
 import json
 
 api = Namespace('users', description='User operations')
@@ -56,12 +61,34 @@ user_moderation_model = api.model('UserModeration', {
 })
 
 
+def refuse_when_overloaded(func):
+    """
+    Ask the client to retry when too many passwords are being hashed.
+    The refusal is answered by the endpoint itself and logged on one
+    line: flask-restx would log the traceback of each one.
+    """
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        try:
+            return func(*args, **kwargs)
+        except HashingOverloaded as error:
+            current_app.logger.warning(
+                "Password hashing overloaded, %s %s refused "
+                "(%d refused so far)", request.method, request.path,
+                facade.hashing.stats()['rejected'])
+            return ({'error': str(error)}, 503,
+                    {'Retry-After': str(error.retry_after)})
+    return wrapper
+
+
 @api.route('/')
 class UserList(Resource):
     @api.doc(security=[])
     @api.expect(user_model)
     @api.response(201, 'User successfully created')
+    @api.response(503, 'Too many password operations, retry later')
     @api.response(400, 'Email already registered or invalid input')
+    @refuse_when_overloaded
     def post(self):
         """Register new user"""
         try:
@@ -77,13 +104,22 @@ class UserList(Resource):
         return UserPublic.model_validate(new_user).model_dump(), 201
 
     @jwt_required()
-    @api.doc(params={'email': 'Filter user by email (optional)'})
-    @api.response(200, 'User(s) found')
+    @api.doc(params={'email': 'Filter user by email (optional)',
+                     **page_params})
+    @api.response(200, 'User(s) found', headers={
+        'X-Next-Cursor': 'Cursor of the next page, absent on the last page'
+    })
+    @api.response(400, 'Invalid pagination parameters')
     @api.response(401, 'Unauthorized')
     @api.response(403, 'Forbidden')
     @api.response(404, 'User not found')
+    @query_budget(4)
     def get(self):
-        """Get all users or by email query"""
+        """
+        Get a page of the users, or a user by email.
+        Pages hold 20 users unless a limit is given; the
+        next one is requested with the X-Next-Cursor of the response.
+        """
         current_user_id = get_jwt_identity()
         current_user = facade.get_user(current_user_id)
         if (current_user.is_admin is False):
@@ -96,11 +132,17 @@ class UserList(Resource):
 
             return UserPublic.model_validate(user).model_dump(), 200
 
-        users = facade.get_all_users()
+        try:
+            limit, cursor = get_page_args()
+            users, next_cursor = facade.get_users_page(
+                limit or DEFAULT_PAGE_SIZE, cursor)
+        except ValueError as e:
+            return {'error': str(e)}, 400
+
         return [
             UserPublic.model_validate(user).model_dump()
             for user in users
-            ], 200
+            ], 200, page_headers(next_cursor)
 
 
 @api.route('/<user_id>')
@@ -130,6 +172,8 @@ class UserResource(Resource):
     @api.response(401, 'Unauthorized')
     @api.response(403, 'Forbidden')
     @api.response(404, 'User not found')
+    @api.response(503, 'Too many password operations, retry later')
+    @refuse_when_overloaded
     def put(self, user_id):
         """Update an existing user"""
         current_user_id = get_jwt_identity()
@@ -210,8 +254,10 @@ class Login(Resource):
     @api.expect(login_model, validate=True)
     @api.response(200, 'Token created')
     @api.response(400, 'Invalid password or email')
+    @api.response(503, 'Too many password operations, retry later')
     @api.response(403, 'Forbidden')
     @api.response(404, 'User not found')
+    @refuse_when_overloaded
     def post(self):
         """Login the user"""
         data = request.json
@@ -224,8 +270,8 @@ class Login(Resource):
         if not user:
             return {'error': 'User not found'}, 404
         try:
-            facade.passwd_hasher.verify(
-                user.hashed_password, login_data.password)
+            facade.verify_password(user.hashed_password,
+                                   login_data.password)
         except VerifyMismatchError:
             return {'error': 'Invalid password or email'}, 400
         
@@ -264,6 +310,8 @@ class Logout(Resource):
     @api.response(401, 'Unauthorized')
     @jwt_required()
     def post(self):
+        token = get_jwt()
+        revoked_tokens.revoke(token['jti'], token['exp'])
         response = make_response({"Message": "Access token revoked"})
         response.delete_cookie('access_token')
         return response
@@ -275,6 +323,8 @@ class LogoutRefresh(Resource):
     @api.response(401, 'Unauthorized')
     @jwt_required(refresh=True)
     def post(self):
+        token = get_jwt()
+        revoked_tokens.revoke(token['jti'], token['exp'])
         response = make_response({"Message": "Refresh token revoked"})
         response.delete_cookie('refresh_token')
         return response
@@ -287,7 +337,9 @@ class AdminCreation(Resource):
     @api.response(400, 'Email already registered or invalid input')
     @api.response(401, 'Unauthorized')
     @api.response(403, 'Forbidden')
+    @api.response(503, 'Too many password operations, retry later')
     @jwt_required()
+    @refuse_when_overloaded
     def post(self):
         """
         Create a new admin.
@@ -24,7 +24,7 @@ class Amenity(db.Model):
     __tablename__ = 'amenity'
 
     id = db.Column(db.String, primary_key=True)
-    name = db.Column(db.String(100), nullable=False)
+    name = db.Column(db.String(100), nullable=False, index=True)
     description = db.Column(db.String(500), nullable=False)
     created_at = db.Column(
         db.DateTime(timezone=True), default=lambda: datetime.now(timezone.utc),
@@ -0,0 +1,116 @@
+"""
+This module defines the day-by-day availability calendar of the places.
+Each row holds one year of a place as a bitset, one bit per day, set
+when the day is taken by a booking that is not cancelled.
+"""
+
+from extensions import db  # db = SQLAlchemy()
+from datetime import date, timedelta
+from pydantic import BaseModel, Field, model_validator
+from typing import Optional
+
+# 366 days rounded up to whole bytes
+YEAR_BYTES = 46
+MAX_CALENDAR_DAYS = 731
+
+
+def booked_range(start_date, end_date):
+    """
+    The days taken by a stay: from the arrival day up to the departure
+    day excluded, and at least the arrival day.
+    """
+    first = start_date.date()
+    last = max(end_date.date(), first + timedelta(days=1))
+    return first, last
+
+
+def split_by_year(first, last):
+    """
+    Split the days [first, last) into one (year, first, last) per year.
+    """
+    while first < last:
+        year_end = min(date(first.year + 1, 1, 1), last)
+        yield first.year, first, year_end
+        first = year_end
+
+
+def day_index(day, end=False):
+    """
+    Position of a day in the bitset of its year. As the end of a range,
+    the first of January of the next year is the end of the bitset.
+    """
+    if end and day.month == 1 and day.day == 1:
+        return (date(day.year, 1, 1) - date(day.year - 1, 1, 1)).days
+    return day.timetuple().tm_yday - 1
+
+
+class Availability(db.Model):
+    """
+    Represents one year of the availability calendar of a place.
+
+    Attributes:
+        place_id: UUID of the place.
+        year: Calendar year covered by the row.
+        days: Bitset of the taken days, bit n is day n of the year.
+    """
+
+    __tablename__ = 'availability'
+
+    place_id = db.Column(db.String, db.ForeignKey('place.id'),
+                         primary_key=True)
+    year = db.Column(db.Integer, primary_key=True)
+    days = db.Column(db.LargeBinary(YEAR_BYTES), nullable=False,
+                     default=bytes(YEAR_BYTES))
+
+    def set_days(self, first, last, booked=True):
+        """
+        Mark the days [first, last) of this year as taken or free.
+        """
+        bits = bytearray(self.days or bytes(YEAR_BYTES))
+        for index in range(day_index(first), day_index(last, end=True)):
+            if booked:
+                bits[index >> 3] |= 1 << (index & 7)
+            else:
+                bits[index >> 3] &= ~(1 << (index & 7)) & 0xFF
+        self.days = bytes(bits)
+
+    def booked_days(self, first, last):
+        """
+        List the taken days among the days [first, last) of this year.
+        """
+        bits = self.days or bytes(YEAR_BYTES)
+        start = date(self.year, 1, 1)
+        return [
+            start + timedelta(days=index)
+            for index in range(day_index(first), day_index(last, end=True))
+            if bits[index >> 3] & (1 << (index & 7))
+        ]
+
+
+class AvailabilityQuery(BaseModel):
+    """
+    Schema used to read the availability calendar of a place.
+    Attributes:
+        from_date: First day of the calendar, today by default.
+        to_date: Day after the last day of the calendar,
+        90 days after from_date by default.
+    """
+
+    from_date: Optional[date] = Field(None, alias='from')
+    to_date: Optional[date] = Field(None, alias='to')
+
+    @model_validator(mode='after')
+    def check_dates(self):
+        """
+        Fill the default dates and check the calendar length.
+        """
+        if self.from_date is None:
+            self.from_date = date.today()
+        if self.to_date is None:
+            self.to_date = self.from_date + timedelta(days=90)
+        if self.from_date >= self.to_date:
+            raise ValueError("'from' must be before 'to'")
+        if (self.to_date - self.from_date).days > MAX_CALENDAR_DAYS:
+            raise ValueError(
+                f"The calendar can't exceed {MAX_CALENDAR_DAYS} days")
+        return self
@@ -68,6 +68,11 @@ class Booking(db.Model):
             "status IN ('DONE', 'PENDING', 'CANCELLED')",
             name="check_booking_status"
         ),
+        db.Index('ix_bookings_created_at_id', 'created_at', 'id'),
+        db.Index('ix_bookings_place_status_dates',
+                 'place', 'status', 'start_date', 'end_date'),
+        db.Index('ix_bookings_user', 'user'),
+        db.Index('ix_bookings_status_end_date', 'status', 'end_date'),
     )
 
     def set_status(self, status: BookingStatus):
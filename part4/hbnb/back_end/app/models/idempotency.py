@@ -0,0 +1,40 @@
+"""
+This module defines the stored responses of the requests sent with an
+Idempotency-Key header, so that a retried request can be answered
+without running it twice.
+"""
+
+from extensions import db  # db = SQLAlchemy()
+from datetime import datetime, timezone
+
+
+class IdempotencyKey(db.Model):
+    """
+    Represents the response given to a request sent with an
+    Idempotency-Key header.
+
+    Attributes:
+        user_id: UUID of the user who sent the request.
+        key: Value of the Idempotency-Key header.
+        fingerprint: Hash of the method, path and body of the request.
+        status_code: Status code of the response.
+        response: JSON body of the response.
+        created_at: Timestamp when the request was first served.
+        expires_at: Timestamp after which the key can be reused.
+    """
+
+    __tablename__ = 'idempotency_keys'
+
+    user_id = db.Column(db.String, primary_key=True)
+    key = db.Column(db.String(255), primary_key=True)
+    fingerprint = db.Column(db.String(64), nullable=False)
+    status_code = db.Column(db.Integer, nullable=True)
+    response = db.Column(db.JSON, nullable=True)
+    created_at = db.Column(
+        db.DateTime(timezone=True), default=lambda: datetime.now(timezone.utc),
+        nullable=False
+        )
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+
+    def __repr__(self):
+        return f"<IdempotencyKey {self.user_id} {self.key}>"
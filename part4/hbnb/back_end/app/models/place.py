@@ -6,14 +6,15 @@ including associated amenities, reviews, and photo handling.
 
 import uuid
 from pydantic import BaseModel, Field, field_validator, ConfigDict
-from pydantic import AnyUrl
-from typing import Optional, List
+from pydantic import AnyUrl, model_validator, ValidationInfo
+from typing import Optional, List, Tuple
 from datetime import datetime, timezone
 from sqlalchemy import CheckConstraint
 from extensions import db  # db = SQLAlchemy()
 from .booking import Booking
+from .availability import Availability
+from image_validator import image_validator
 import re
-import requests
 
 # Default image URL to use when no photos are provided for a place
 DEFAULT_PLACE_PHOTO_URL = (
@@ -22,13 +23,19 @@ DEFAULT_PLACE_PHOTO_URL = (
     "available-illustration-free-vector.jpg"
 )
 
+# Photos accepted without checking them, until the photos job has checked
+# them and replaced the invalid ones with the default photo
+PHOTOS_PENDING = 'pending'
+PHOTOS_CHECKED = 'checked'
+
 
 place_amenities = db.Table(
     'place_amenities',
     db.Column('place_id', db.String, db.ForeignKey('place.id'),
               primary_key=True),
     db.Column('amenity.id', db.String, db.ForeignKey('amenity.id'),
-              primary_key=True)
+              primary_key=True),
+    db.Index('ix_place_amenities_amenity', 'amenity.id', 'place_id')
 )
 
 
@@ -50,6 +57,10 @@ class Place(db.Model):
         photos: List of photo URLs representing the place.
         reviews: List of Review objects linked to this place.
         rating: Average rating calculated from reviews, default 0.0.
+        rating_sum: Sum of the ratings of the reviews.
+        review_count: Number of reviews.
+        photos_status: 'pending' while the photos are not checked yet,
+            'checked' once they are.
     """
     __tablename__ = 'place'
 
@@ -61,6 +72,10 @@ class Place(db.Model):
     longitude = db.Column(db.Float, nullable=False)
     owner_id = db.Column(db.String, db.ForeignKey('user.id'), nullable=False)
     rating = db.Column(db.Float, nullable=True)
+    rating_sum = db.Column(db.Float, nullable=False, default=0.0,
+                           server_default='0')
+    review_count = db.Column(db.Integer, nullable=False, default=0,
+                             server_default='0')
     created_at = db.Column(
         db.DateTime(timezone=True), default=lambda: datetime.now(timezone.utc),
         nullable=False)
@@ -69,6 +84,9 @@ class Place(db.Model):
         onupdate=datetime.now(timezone.utc)
         )
     photos_url = db.Column(db.JSON, default=list)
+    photos_status = db.Column(db.String(16), nullable=False,
+                              default=PHOTOS_CHECKED,
+                              server_default=PHOTOS_CHECKED)
     amenities = db.relationship('Amenity', secondary=place_amenities,
                                 back_populates='places')
     reviews = db.relationship("Review", back_populates='place_rel',
@@ -76,6 +94,8 @@ class Place(db.Model):
     bookings = db.relationship(Booking, back_populates='place_rel',
                                cascade='all, delete-orphan',
                                foreign_keys=[Booking.place])
+    availability = db.relationship(Availability,
+                                   cascade='all, delete-orphan')
     owner = db.relationship('User', back_populates='places')
 
     __table_args__ = (
@@ -84,7 +104,14 @@ class Place(db.Model):
         CheckConstraint('latitude >= -90 AND latitude <= 90',
                         name='check_latitude'),
         CheckConstraint('longitude >= -180 AND longitude <= 180',
-                        name='check_longitude')
+                        name='check_longitude'),
+        db.Index('ix_place_created_at_id', 'created_at', 'id'),
+        db.Index('ix_place_price', 'price'),
+        db.Index('ix_place_rating', 'rating'),
+        db.Index('ix_place_owner_id', 'owner_id'),
+        db.Index('ix_place_latitude_longitude', 'latitude', 'longitude'),
+        db.Index('ix_place_photos_pending', 'photos_status',
+                 sqlite_where=db.text(f"photos_status = '{PHOTOS_PENDING}'"))
     )
 
     @property
@@ -187,14 +214,14 @@ class Place(db.Model):
 
     def update_average_rating(self):
         """
-        Calculate and update the average rating based on the current reviews.
+        Calculate and update the average rating from the running sum and
+        count of the reviews, without loading them.
         If no reviews exist, the rating is set to 0.
         """
-        if not self.reviews:
+        if not self.review_count:
             self.rating = 0.0
         else:
-            total = sum(review.rating for review in self.reviews)
-            self.rating = round(total / len(self.reviews), 1)
+            self.rating = round(self.rating_sum / self.review_count, 1)
 
 
 class PlaceCreate(BaseModel):
@@ -224,33 +251,16 @@ class PlaceCreate(BaseModel):
 
     @field_validator("photos_url")
     @classmethod
-    def validate_image(cls, photos):
+    def validate_image(cls, photos, info: ValidationInfo):
+        """
+        Check that the photos point to images, unless the context asks
+        to defer the check to the photos job.
+        """
         if photos is None:
             return []
-        validated = []
-        for url in photos:
-            if url is None:
-                return None
-            try:
-                response = requests.head(str(url), timeout=5, allow_redirects=True)
-                if response.status_code == 200:
-                    content_type = response.headers.get('Content-Type', '')
-                    if content_type.startswith('image/'):
-                        validated.append(str(url))
-                        continue
-
-                headers = {'Range': 'bytes=0-1023'}
-                response = requests.get(str(url), headers=headers, timeout=5,
-                                        stream=True, allow_redirects=True)
-                if response.status_code in (200, 206):
-                    content_type = response.headers.get('Content-Type', '')
-                    if content_type.startswith('image/'):
-                        return url
-                raise ValueError("The URL is not a valid image")
-            except requests.RequestException as e:
-                raise ValueError(f"An error occured while the verification"
-                                " of the image")
-        return validated
+        if (info.context or {}).get('defer_photos'):
+            return [str(url) for url in photos]
+        return image_validator.validate_many(photos)
 
     @field_validator('price')
     def round_price(cls, value: float) -> float:
@@ -311,34 +321,22 @@ class PlaceUpdate(BaseModel):
 
     @field_validator("photos_url")
     @classmethod
-    def validate_image(cls, photos):
+    def validate_image(cls, photos, info: ValidationInfo):
+        """
+        Check that the photos added to the place point to images. The
+        photos already stored, given as trusted_photos in the context,
+        are not checked again, and the new ones are not checked when the
+        context asks to defer the check to the photos job.
+        """
         if not photos:
             return []
-        validated = []
-        for url in photos:
-            if url is None:
-                continue
-            try:
-                response = requests.head(str(url), timeout=5, allow_redirects=True)
-                if response.status_code == 200:
-                    content_type = response.headers.get('Content-Type', '')
-                    if content_type.startswith('image/'):
-                        validated.append(str(url))
-                        continue
-
-                headers = {'Range': 'bytes=0-1023'}
-                response = requests.get(str(url), headers=headers, timeout=5,
-                                    stream=True, allow_redirects=True)
-                if response.status_code in (200, 206):
-                    content_type = response.headers.get('Content-Type', '')
-                    if content_type.startswith('image/'):
-                        validated.append(str(url))
-                        continue
-
-                raise ValueError("The URL is not a valid image")
-            except requests.RequestException as e:
-                raise ValueError("An error occurred while verifying the image URL")
-        return validated
+        context = info.context or {}
+        photos = [url for url in photos if url is not None]
+        trusted = {str(url) for url in context.get('trusted_photos') or []}
+        added = [url for url in photos if str(url) not in trusted]
+        if added and not context.get('defer_photos'):
+            image_validator.validate_many(added)
+        return photos
 
 
     @field_validator('price')
@@ -370,6 +368,114 @@ class PlaceUpdate(BaseModel):
         return value
 
 
+class PlaceFilter(BaseModel):
+    """
+    Schema for the query parameters used to filter the list of places.
+
+    Attributes:
+        min_price: Lowest accepted price.
+        max_price: Highest accepted price.
+        min_rating: Lowest accepted average rating.
+        amenity_ids: Comma separated amenity IDs the place must all have.
+        bbox: Bounding box as 'south,west,north,east' in degrees.
+    """
+
+    min_price: Optional[float] = Field(None, ge=0)
+    max_price: Optional[float] = Field(None, ge=0)
+    min_rating: Optional[float] = Field(None, ge=0, le=5)
+    amenity_ids: Optional[List[uuid.UUID]] = None
+    bbox: Optional[Tuple[float, float, float, float]] = None
+
+    @field_validator('amenity_ids', 'bbox', mode='before')
+    @classmethod
+    def split_list(cls, value):
+        """
+        Accept the comma separated form used in query strings.
+        """
+        if isinstance(value, str):
+            return [item.strip() for item in value.split(',') if item.strip()]
+        return value
+
+    @field_validator('bbox')
+    @classmethod
+    def check_bbox(cls, bbox):
+        """
+        Ensure the bounding box corners are valid coordinates.
+        The west edge may be greater than the east edge when the box
+        crosses the antimeridian.
+        """
+        if bbox is None:
+            return bbox
+        south, west, north, east = bbox
+        if not (-90 <= south <= north <= 90):
+            raise ValueError("bbox latitudes must be between -90 and 90 "
+                             "with south <= north")
+        if not (-180 <= west <= 180 and -180 <= east <= 180):
+            raise ValueError("bbox longitudes must be between -180 and 180")
+        return bbox
+
+    @model_validator(mode='after')
+    def check_price_range(self):
+        """
+        Ensure the price range is not empty.
+        """
+        if (self.min_price is not None and self.max_price is not None
+                and self.min_price > self.max_price):
+            raise ValueError("min_price must be lower than max_price")
+        return self
+
+
+class PlaceAvailableFilter(PlaceFilter):
+    """
+    Schema for the query parameters of the search of the places that
+    are free for a stay, on top of the PlaceFilter ones.
+
+    Attributes:
+        start_date: Arrival date of the stay.
+        end_date: Departure date of the stay.
+    """
+
+    start_date: datetime
+    end_date: datetime
+
+    @field_validator('start_date', 'end_date')
+    @classmethod
+    def ensure_utc(cls, value: datetime) -> datetime:
+        """
+        Read the dates given without a timezone as UTC, so that a naive
+        and an aware date can be compared.
+        """
+        if value.tzinfo is None:
+            return value.replace(tzinfo=timezone.utc)
+        return value.astimezone(timezone.utc)
+
+    @model_validator(mode='after')
+    def check_dates(self):
+        """
+        Ensure the stay ends after it starts.
+        """
+        if self.start_date >= self.end_date:
+            raise ValueError("Start date must be before end date")
+        return self
+
+
+class PlaceNearby(BaseModel):
+    """
+    Schema for the query parameters of the nearby places search.
+
+    Attributes:
+        lat: Latitude of the search center.
+        lon: Longitude of the search center.
+        radius_km: Search radius in kilometers.
+        limit: Maximum number of places returned, closest first.
+    """
+
+    lat: float = Field(..., ge=-90, le=90)
+    lon: float = Field(..., ge=-180, le=180)
+    radius_km: float = Field(10, gt=0, le=500)
+    limit: int = Field(20, ge=1, le=100)
+
+
 class PlacePublic(BaseModel):
     """
     This class is used to display public informations when a place is
@@ -385,6 +491,7 @@ class PlacePublic(BaseModel):
     owner_id: str
     amenity_ids: Optional[List[str]] = []
     photos_url: Optional[List[AnyUrl]] = []
+    photos_status: str = PHOTOS_CHECKED
 
     model_config = ConfigDict(
                 json_encoders={datetime: lambda v: v.isoformat(),
@@ -54,6 +54,10 @@ class Review(db.Model):
     __table_args__ = (
         db.CheckConstraint('rating >= 0 AND rating <= 5',
                            name='check_rating_range'),
+        db.Index('ix_reviews_created_at_id', 'created_at', 'id'),
+        db.Index('ix_reviews_place_created_at_id',
+                 'place', 'created_at', 'id'),
+        db.Index('uq_reviews_booking', 'booking', unique=True),
     )
 
     def set_comment(self, comment: str) -> None:
@@ -12,8 +12,8 @@ from app.models.review import Review
 from app.models.booking import Booking
 from typing import Optional
 from extensions import db  # db = SQLAlchemy()
+from image_validator import image_validator
 import re
-import requests
 
 
 # Default profile picture URL used when no photo_url is provided by the user
@@ -66,6 +66,10 @@ class User(db.Model):
     bookings = db.relationship(Booking, back_populates='user_rel',
                                cascade='all, delete-orphan')
 
+    __table_args__ = (
+        db.Index('ix_user_created_at_id', 'created_at', 'id'),
+    )
+
     def set_first_name(self, first_name):
         self.first_name = first_name
         self.updated_at = datetime.now(timezone.utc)
@@ -98,25 +102,8 @@ class UserCreate(BaseModel):
     def validate_image(cls, url):
         if url is None:
             return None
-        try:
-
-            response = requests.head(str(url), timeout=5, allow_redirects=True)
-            if response.status_code == 200:
-                content_type = response.headers.get('Content-Type', '')
-                if content_type.startswith('image/'):
-                    return url
-
-            headers = {'Range': 'bytes=0-1023'}
-            response = requests.get(str(url), headers=headers, timeout=5,
-                                    stream=True, allow_redirects=True)
-            if response.status_code in (200, 206):
-                content_type = response.headers.get('Content-Type', '')
-                if content_type.startswith('image/'):
-                    return url
-            raise ValueError("The URL is not a valid image")
-        except requests.RequestException as e:
-            raise ValueError(f"An error occured while the verification"
-                             " of the image")
+        image_validator.validate(str(url))
+        return url
 
     @classmethod
     def set_default_photo(cls, photo_url):
@@ -165,25 +152,8 @@ class UserUpdate(BaseModel):
     def validate_image(cls, url):
         if url is None:
             return None
-        try:
-            # HEAD request
-            response = requests.head(str(url), timeout=5, allow_redirects=True)
-            if response.status_code == 200:
-                content_type = response.headers.get('Content-Type', '')
-                if content_type.startswith('image/'):
-                    return url
-            # GET partial content
-            headers = {'Range': 'bytes=0-1023'}
-            response = requests.get(str(url), headers=headers, timeout=5,
-                                    stream=True, allow_redirects=True)
-            if response.status_code in (200, 206):
-                content_type = response.headers.get('Content-Type', '')
-                if content_type.startswith('image/'):
-                    return url
-            raise ValueError("The URL is not a valid image")
-        except requests.RequestException as e:
-            raise ValueError(f"An error occured while the verification"
-                             " of the image")
+        image_validator.validate(str(url))
+        return url
 
     @classmethod
     def set_default_photo(cls, photo_url):
@@ -259,7 +229,7 @@ class RevokedToken(db.Model):
     __tablename__ = 'revoked_tokens'
 
     jti = db.Column(db.String(36), primary_key=True)
-    expires_at = db.Column(db.DateTime, nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
 
     def __repr__(self):
         return f"<RevokedToken {self.jti}>"
@@ -0,0 +1,79 @@
+'''
+This module contains the in-process cache used in front of the
+repositories to avoid reading the same rows again on every request.
+'''
+from collections import OrderedDict
+from threading import Lock
+import time
+
+
+class LRUCache:
+    '''
+    A thread-safe least recently used cache whose entries expire
+    after ttl seconds. It counts hits and misses to measure how many
+    reads it saves.
+    '''
+    def __init__(self, maxsize=1024, ttl=60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key):
+        '''
+        Return the value stored for key, or None if it is missing
+        or expired.
+        '''
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def set(self, key, value, ttl=None):
+        '''
+        Store a value, evicting the least recently used entry when full.
+        '''
+        ttl = self.ttl if ttl is None else ttl
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        '''
+        Remove an entry if present.
+        '''
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        '''
+        Remove every entry.
+        '''
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        '''
+        Return the counters of the cache.
+        '''
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0
+            }
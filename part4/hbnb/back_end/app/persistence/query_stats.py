@@ -0,0 +1,107 @@
+'''
+This module counts the SQL statements issued by each request.
+It reports them in response headers, warns when the same statement is
+repeated many times in a request (N+1 pattern) and checks the query
+budgets declared on the endpoints.
+'''
+from collections import Counter
+from flask import current_app, g, has_request_context, request
+from functools import wraps
+from sqlalchemy import event
+from extensions import db
+import json
+import time
+
+
+class QueryStats:
+    '''
+    The statements issued while serving one request.
+    '''
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.shapes = Counter()
+
+
+def query_budget(max_queries):
+    '''
+    Declare the maximum number of statements an endpoint may issue.
+    Going over it is logged, and turned into an error when
+    SQL_QUERY_BUDGET_STRICT is set.
+    '''
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if has_request_context():
+                g.query_budget = max_queries
+            return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters,
+                           context, executemany):
+    if has_request_context() and 'query_stats' in g:
+        conn.info.setdefault('query_start', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters,
+                          context, executemany):
+    if not (has_request_context() and 'query_stats' in g):
+        return
+    starts = conn.info.get('query_start')
+    if not starts:
+        return
+    stats = g.query_stats
+    stats.count += 1
+    stats.duration += time.perf_counter() - starts.pop()
+    stats.shapes[statement] += 1
+
+    threshold = current_app.config.get('SQL_N_PLUS_ONE_THRESHOLD', 10)
+    if stats.shapes[statement] == threshold + 1:
+        current_app.logger.warning(
+            "Possible N+1 query in %s: statement repeated more than %d "
+            "times: %s", g.get('query_endpoint'), threshold,
+            ' '.join(statement.split())[:300])
+
+
+def init_query_stats(app):
+    '''
+    Hook the statement counter on the engine of the application and
+    on its requests.
+    '''
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute',
+                     _before_cursor_execute)
+        event.listen(db.engine, 'after_cursor_execute',
+                     _after_cursor_execute)
+
+    @app.before_request
+    def start_query_stats():
+        g.query_stats = QueryStats()
+        g.query_endpoint = f"{request.method} {request.path}"
+
+    @app.after_request
+    def report_query_stats(response):
+        stats = g.pop('query_stats', None)
+        if stats is None:
+            return response
+        budget = g.pop('query_budget', None)
+
+        if budget is not None and stats.count > budget:
+            message = (f"Query budget exceeded in {g.get('query_endpoint')}"
+                       f": {stats.count} statements for a budget "
+                       f"of {budget}")
+            app.logger.warning(message)
+            if app.config.get('SQL_QUERY_BUDGET_STRICT', False):
+                response = app.response_class(
+                    json.dumps({'error': message}), status=500,
+                    mimetype='application/json')
+
+        if app.config.get('SQL_QUERY_HEADERS', app.debug):
+            response.headers['X-Query-Count'] = str(stats.count)
+            response.headers['X-Query-Time-Ms'] = (
+                f"{stats.duration * 1000:.2f}")
+            if budget is not None:
+                response.headers['X-Query-Budget'] = str(budget)
+        return response
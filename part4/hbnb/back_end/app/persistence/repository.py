@@ -1,11 +1,135 @@
 from abc import ABC, abstractmethod
 from app import db
+from contextlib import contextmanager
 from datetime import datetime, timezone
+from flask import g, has_app_context
+from sqlalchemy import event, insert, update, delete, and_, or_
+from sqlalchemy.orm import Session, make_transient_to_detached
+from sqlalchemy.orm.util import identity_key
+import base64
+import copy
+import json
 '''
 This is the module containing the base repositories for the database
 configuration.
 '''
 
+# Number of ids bound in a single IN (...) clause by the bulk operations,
+# kept under the SQLite host parameter limit.
+BULK_CHUNK_SIZE = 500
+
+# Repository of each model, to find the cache of an object deleted by an
+# ORM cascade rather than through its own repository
+_repositories = {}
+
+
+def chunked(values, size=BULK_CHUNK_SIZE):
+    '''
+    Split a list of values into lists of at most size elements.
+    '''
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def in_unit_of_work():
+    '''
+    Tell if the current context stages its changes in a unit of work
+    instead of committing them one by one.
+    '''
+    return has_app_context() and g.get('unit_of_work', False)
+
+
+def save_changes():
+    '''
+    Commit the session, or only flush it when a unit of work is open.
+    In that case the commit happens once, when the unit of work ends.
+    '''
+    if in_unit_of_work():
+        db.session.flush()
+    else:
+        db.session.commit()
+
+
+def begin_unit_of_work():
+    '''
+    Open a unit of work: repositories will flush instead of commit.
+    '''
+    g.unit_of_work = True
+
+
+def end_unit_of_work(success=True):
+    '''
+    Close the current unit of work with a single commit,
+    or roll every staged change back.
+    '''
+    if not g.pop('unit_of_work', False):
+        return
+    invalidated = g.pop('cache_invalidations', [])
+    if success:
+        try:
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            _invalidate_again(invalidated)
+            raise
+    else:
+        db.session.rollback()
+        _invalidate_again(invalidated)
+
+
+def _invalidate_again(invalidated):
+    '''
+    Drop the cache entries that may have been filled with changes
+    that were rolled back.
+    '''
+    for cache, keys in invalidated:
+        for key in keys:
+            cache.delete(key)
+
+
+@contextmanager
+def unit_of_work():
+    '''
+    Run a block of repository calls as one transaction.
+    Nested calls join the unit of work already opened.
+    '''
+    if in_unit_of_work():
+        yield
+        return
+    begin_unit_of_work()
+    try:
+        yield
+    except Exception:
+        end_unit_of_work(success=False)
+        raise
+    end_unit_of_work()
+
+
+def encode_cursor(values):
+    '''
+    Turn the sort key of the last returned row into an opaque cursor.
+    '''
+    raw = json.dumps([
+        value.isoformat() if isinstance(value, datetime) else value
+        for value in values
+    ])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, size=2):
+    '''
+    Read back the list of size values stored in a cursor.
+    Raises ValueError if the cursor was not produced by encode_cursor.
+    '''
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except ValueError:
+        raise ValueError("Invalid cursor")
+    if not isinstance(values, list) or len(values) != size:
+        raise ValueError("Invalid cursor")
+    return values
+
 
 class Repository(ABC):
     '''
@@ -36,21 +160,115 @@ class Repository(ABC):
     def get_by_attribute(self, attr_name, attr_value):
         pass
 
+    @abstractmethod
+    def get_page(self, limit, cursor=None, query=None):
+        pass
+
+    @abstractmethod
+    def add_many(self, rows):
+        pass
+
+    @abstractmethod
+    def update_many(self, obj_ids, data):
+        pass
+
+    @abstractmethod
+    def delete_many(self, obj_ids):
+        pass
+
+
+@event.listens_for(Session, 'after_flush')
+def _invalidate_deleted(session, flush_context):
+    '''
+    Drop the cached copies of every object deleted by the flush, the
+    ones removed by a cascade included, so that they are not rebuilt
+    from the cache once their rows are gone.
+    '''
+    for obj in session.deleted:
+        repository = _repositories.get(type(obj))
+        if repository is not None:
+            repository.invalidate([obj.id])
+
 
 class SQLAlchemyRepository(Repository):
-    def __init__(self, model):
+    def __init__(self, model, cache=None):
         self.model = model
+        self.cache = cache
+        _repositories[model] = self
 
     def add(self, obj):
         db.session.add(obj)
-        db.session.commit()
+        save_changes()
 
     def get(self, obj_id):
-        return self.model.query.get(str(obj_id))
+        if self.cache is None:
+            return self.model.query.get(str(obj_id))
+
+        obj_id = str(obj_id)
+        obj = db.session.identity_map.get(identity_key(self.model, obj_id))
+        if obj is not None:
+            return obj
+
+        values = self.cache.get(obj_id)
+        if values is not None:
+            obj = self.model(**copy.deepcopy(values))
+            make_transient_to_detached(obj)
+            return db.session.merge(obj, load=False)
+
+        obj = self.model.query.get(obj_id)
+        if obj is not None:
+            self.cache.set(obj_id, copy.deepcopy({
+                column.key: getattr(obj, column.key)
+                for column in self.model.__mapper__.column_attrs
+            }))
+        return obj
+
+    def invalidate(self, obj_ids):
+        '''
+        Drop the cached copies of the given objects, and drop them again
+        if the unit of work they were changed in is rolled back.
+        '''
+        if self.cache is None:
+            return
+        keys = [str(obj_id) for obj_id in obj_ids]
+        for key in keys:
+            self.cache.delete(key)
+        if in_unit_of_work():
+            g.setdefault('cache_invalidations', []).append((self.cache, keys))
 
     def get_all(self):
         return self.model.query.all()
 
+    def get_page(self, limit, cursor=None, query=None):
+        '''
+        Return one page of objects ordered by (created_at, id) and the
+        cursor of the next page, or None on the last page.
+        A filtered query can be given to paginate a subset of the table.
+        '''
+        if query is None:
+            query = self.model.query
+        created_at = self.model.created_at
+        if cursor:
+            last_created_at, last_id = decode_cursor(cursor)
+            try:
+                last_created_at = datetime.fromisoformat(last_created_at)
+            except (ValueError, TypeError):
+                raise ValueError("Invalid cursor")
+            query = query.filter(or_(
+                created_at > last_created_at,
+                and_(created_at == last_created_at,
+                     self.model.id > last_id)
+            ))
+        items = (query.order_by(created_at, self.model.id)
+                 .limit(limit + 1).all())
+
+        next_cursor = None
+        if len(items) > limit:
+            items = items[:limit]
+            next_cursor = encode_cursor([items[-1].created_at,
+                                         items[-1].id])
+        return items, next_cursor
+
     def update(self, obj_id, data):
         obj = self.get(obj_id)
         if obj:
@@ -60,14 +278,67 @@ class SQLAlchemyRepository(Repository):
             if hasattr(obj, "updated_at"):
                 setattr(obj, "updated_at", datetime.now(timezone.utc))
 
-            db.session.commit()
+            self.invalidate([obj_id])
+            save_changes()
             return obj
 
     def delete(self, obj_id):
         obj = self.get(obj_id)
         if obj:
             db.session.delete(obj)
-            db.session.commit()
+            self.invalidate([obj_id])
+            save_changes()
 
     def get_by_attribute(self, attr_name, attr_value):
         return self.model.query.filter_by(**{attr_name: attr_value}).first()
+
+    def add_many(self, rows):
+        '''
+        Insert a list of rows (dicts of column values) with a single
+        executemany statement. Returns the number of inserted rows.
+        '''
+        rows = list(rows)
+        if not rows:
+            return 0
+        db.session.execute(insert(self.model), rows)
+        save_changes()
+        return len(rows)
+
+    def update_many(self, obj_ids, data):
+        '''
+        Apply the same values to every object of the list with set-based
+        UPDATE statements. Returns the number of updated rows.
+        '''
+        obj_ids = [str(obj_id) for obj_id in obj_ids]
+        values = dict(data)
+        if hasattr(self.model, "updated_at"):
+            values["updated_at"] = datetime.now(timezone.utc)
+
+        count = 0
+        for ids in chunked(obj_ids):
+            result = db.session.execute(
+                update(self.model)
+                .where(self.model.id.in_(ids))
+                .values(**values)
+            )
+            count += result.rowcount
+        self.invalidate(obj_ids)
+        save_changes()
+        return count
+
+    def delete_many(self, obj_ids):
+        '''
+        Delete every object of the list with set-based DELETE statements.
+        ORM cascades are not run. Returns the number of deleted rows.
+        '''
+        obj_ids = [str(obj_id) for obj_id in obj_ids]
+
+        count = 0
+        for ids in chunked(obj_ids):
+            result = db.session.execute(
+                delete(self.model).where(self.model.id.in_(ids))
+            )
+            count += result.rowcount
+        self.invalidate(obj_ids)
+        save_changes()
+        return count
@@ -6,17 +6,39 @@ for the application. It centralizes operations on users, places, amenities,
 reviews, and bookings, using repositories to handle data persistence.
 """
 
-from app.persistence.repository import SQLAlchemyRepository
+from app.persistence.repository import SQLAlchemyRepository, unit_of_work
+from app.persistence.repository import encode_cursor, decode_cursor
+from app.persistence.repository import save_changes
+from app.persistence.cache import LRUCache
+from app.services.hashing import HashingPool
 from app.models.amenity import Amenity, AmenityCreate
-from app.models.place import Place, PlaceCreate
+from app.models.place import Place, PlaceCreate, place_amenities
+from app.models.place import DEFAULT_PLACE_PHOTO_URL
+from app.models.place import PHOTOS_PENDING, PHOTOS_CHECKED
 from app.models.review import Review
 from app.models.user import User, UserCreate, AdminCreate
 from app.models.booking import Booking, BookingStatus
+from app.models.availability import Availability, booked_range
+from app.models.availability import split_by_year
+from app.models.idempotency import IdempotencyKey
 from uuid import UUID, uuid4
 from datetime import datetime, timezone
 from argon2 import PasswordHasher
 import uuid
 from app import db
+from sqlalchemy import func, or_, text, update, delete, case
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import selectinload
+from flask import current_app
+from image_validator import image_validator
+import math
+import re
+
+# Mean radius of the Earth, used for the distance between two places
+EARTH_RADIUS_KM = 6371.0
+# Candidates read per requested nearby place, closest first by the
+# approximate distance, before the exact distance is computed
+NEARBY_CANDIDATE_FACTOR = 4
 
 
 def ensure_aware(dt):
@@ -25,6 +47,46 @@ def ensure_aware(dt):
     return dt
 
 
+def ensure_naive_utc(dt):
+    """Booking dates are stored as naive UTC datetimes."""
+    if dt.tzinfo is not None:
+        return dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return dt
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Great-circle distance in kilometers between two coordinates."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lon2 - lon1)
+    a = (math.sin(d_phi / 2) ** 2
+         + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def bounding_boxes(lat, lon, radius_km):
+    """
+    Return the (south, west, north, east) boxes covering a circle.
+    A circle crossing the antimeridian is split in two boxes.
+    """
+    angle = radius_km / EARTH_RADIUS_KM
+    d_lat = math.degrees(angle)
+    south, north = max(lat - d_lat, -90.0), min(lat + d_lat, 90.0)
+    cos_lat = math.cos(math.radians(lat))
+    if south <= -90 or north >= 90 or math.sin(angle) >= cos_lat:
+        return [(south, -180.0, north, 180.0)]
+
+    d_lon = math.degrees(math.asin(math.sin(angle) / cos_lat))
+    west, east = lon - d_lon, lon + d_lon
+    if west < -180:
+        return [(south, west + 360, north, 180.0),
+                (south, -180.0, north, east)]
+    if east > 180:
+        return [(south, west, north, 180.0),
+                (south, -180.0, north, east - 360)]
+    return [(south, west, north, east)]
+
+
 class HBnBFacade:
     """
     HBnBFacade centralizes all business logic for managing:
@@ -51,11 +113,45 @@ class HBnBFacade:
             hash_len=24,
             salt_len=16
         )
+        self.hashing = HashingPool(self.ph)
+        self.defer_photo_checks = False
+
+    def init_app(self, app):
+        """
+        Apply the application configuration to the facade.
+        REPOSITORY_CACHE maps a repository name (user, place...) to the
+        options of the cache to put in front of it.
+        """
+        for name, options in app.config.get('REPOSITORY_CACHE', {}).items():
+            getattr(self, f'{name}_repo').cache = LRUCache(**options)
+        self.hashing.configure(app.config['PASSWORD_HASH_WORKERS'],
+                               app.config['PASSWORD_HASH_QUEUE'])
+        self.hashing.retry_after = app.config['PASSWORD_HASH_RETRY_AFTER']
+        self.defer_photo_checks = app.config['PLACE_PHOTOS_ASYNC']
+
+    def cache_stats(self):
+        """Return the hit and miss counters of each repository cache."""
+        return {
+            name: repo.cache.stats()
+            for name, repo in (('user', self.user_repo),
+                               ('place', self.place_repo),
+                               ('review', self.review_repo),
+                               ('amenity', self.amenity_repo),
+                               ('booking', self.booking_repo))
+            if repo.cache is not None
+        }
 
     @property
     def passwd_hasher(self):
         return self.ph
 
+    def verify_password(self, hashed_password, password):
+        """
+        Check a password against its hash in the hashing pool.
+        Raises VerifyMismatchError if it does not match.
+        """
+        return self.hashing.verify(hashed_password, password)
+
     # ------------------ User management ------------------
 
     def create_user(self, user_data):
@@ -63,7 +159,7 @@ class HBnBFacade:
         Create a new user with hashed password.
         """
         user_in = UserCreate(**user_data)
-        hashed_pw = self.ph.hash(user_in.password)
+        hashed_pw = self.hashing.hash(user_in.password)
 
         user = User(
             id=str(uuid.uuid4()),
@@ -81,7 +177,7 @@ class HBnBFacade:
         Create a new user with hashed password.
         """
         user_in = AdminCreate(**user_data)
-        hashed_pw = self.ph.hash(user_in.password)
+        hashed_pw = self.hashing.hash(user_in.password)
 
         user = User(
             id=str(uuid.uuid4()),
@@ -112,7 +208,7 @@ class HBnBFacade:
             return None
 
         if "password" in update_data:
-            update_data["hashed_password"] = self.ph.hash(
+            update_data["hashed_password"] = self.hashing.hash(
                 update_data.pop("password")
             )
 
@@ -123,26 +219,226 @@ class HBnBFacade:
         """Retrieve all users."""
         return self.user_repo.get_all()
 
+    def get_users_page(self, limit, cursor=None):
+        """Retrieve one page of users and the next page cursor."""
+        return self.user_repo.get_page(limit, cursor)
+
     def delete_user(self, user_id):
-        """Delete an user by ID."""
+        """
+        Delete an user by ID, with the places they own, which are also
+        dropped from the place cache.
+        """
         user = self.user_repo.get(user_id)
         if not user:
             print(f"User not found for id={user_id}")
             return None
 
-        self.user_repo.delete(user_id)
+        ratings = (db.session.query(Review.place, func.sum(Review.rating),
+                                    func.count(Review.id))
+                   .filter(Review.user_ide == str(user_id))
+                   .group_by(Review.place).all())
+        stays = (db.session.query(Booking.place, Booking.start_date,
+                                  Booking.end_date)
+                 .join(Place, Place.id == Booking.place)
+                 .filter(Booking.user == str(user_id),
+                         Booking.status != BookingStatus.CANCELLED.value,
+                         Place.owner_id != str(user_id))
+                 .all())
+        place_ids = [place_id for (place_id,) in
+                     db.session.query(Place.id)
+                     .filter(Place.owner_id == str(user_id))]
+        with unit_of_work():
+            for place_id, rating_sum, review_count in ratings:
+                self.update_place_rating(place_id, -rating_sum,
+                                         -review_count)
+            self.user_repo.delete(user_id)
+            self.place_repo.invalidate(place_ids)
+            self.refresh_availability(stays)
         return ''
 
     # ------------------ Place management ------------------
 
     def get_all_places(self):
-        return db.session.query(Place).all()
+        return (db.session.query(Place)
+                .options(selectinload(Place.amenities)).all())
+
+    def filter_places(self, filters, limit, cursor=None):
+        """
+        Retrieve one page of the places matching a PlaceFilter, in SQL,
+        and the next page cursor.
+        """
+        return self.place_repo.get_page(limit, cursor,
+                                        self.place_filter_query(filters))
+
+    def get_available_places(self, filters, limit, cursor=None):
+        """
+        Retrieve one page of the places matching a PlaceAvailableFilter
+        with no pending booking overlapping the stay, and the next page
+        cursor. The bookings are checked with an anti-join served by
+        ix_bookings_place_status_dates.
+        """
+        start_date = ensure_naive_utc(filters.start_date)
+        end_date = ensure_naive_utc(filters.end_date)
+        query = self.place_filter_query(filters).filter(~(
+            db.session.query(Booking.id)
+            .filter(Booking.place == Place.id,
+                    Booking.status == BookingStatus.PENDING.value,
+                    Booking.start_date < end_date,
+                    Booking.end_date > start_date)
+            .exists()
+        ))
+        return self.place_repo.get_page(limit, cursor, query)
+
+    def place_filter_query(self, filters):
+        """
+        Build the query of the places matching a PlaceFilter.
+        """
+        query = Place.query.options(selectinload(Place.amenities))
+        if filters.min_price is not None:
+            query = query.filter(Place.price >= filters.min_price)
+        if filters.max_price is not None:
+            query = query.filter(Place.price <= filters.max_price)
+        if filters.min_rating is not None:
+            query = query.filter(Place.rating >= filters.min_rating)
+        if filters.bbox is not None:
+            south, west, north, east = filters.bbox
+            query = query.filter(Place.latitude.between(south, north))
+            if west <= east:
+                query = query.filter(Place.longitude.between(west, east))
+            else:
+                query = query.filter(or_(Place.longitude >= west,
+                                         Place.longitude <= east))
+        if filters.amenity_ids:
+            amenity_ids = {str(amenity_id)
+                           for amenity_id in filters.amenity_ids}
+            amenity_column = place_amenities.c['amenity.id']
+            query = query.filter(Place.id.in_(
+                db.session.query(place_amenities.c.place_id)
+                .filter(amenity_column.in_(amenity_ids))
+                .group_by(place_amenities.c.place_id)
+                .having(func.count(amenity_column) == len(amenity_ids))
+            ))
+        return query
+
+    def get_places_nearby(self, lat, lon, radius_km, limit):
+        """
+        Retrieve the places within radius_km of a point, closest first.
+        Candidates come from the spatial index bounding box query, closest
+        first by an approximate distance and capped to a few times the
+        limit, then the exact distance is computed on them only.
+        Returns a list of (place, distance_km).
+        """
+        max_candidates = limit * NEARBY_CANDIDATE_FACTOR
+        # Squared degrees on a plane tangent at the point, the longitude
+        # difference wrapped around the antimeridian
+        lon_scale = math.cos(math.radians(lat))
+        candidates = []
+        for south, west, north, east in bounding_boxes(lat, lon, radius_km):
+            params = {'south': south, 'west': west,
+                      'north': north, 'east': east,
+                      'lat': lat, 'lon': lon, 'lon_scale': lon_scale,
+                      'max_candidates': max_candidates}
+            if current_app.config.get('SPATIAL_INDEX'):
+                candidates += db.session.execute(text(
+                    "SELECT p.id, p.latitude, p.longitude "
+                    "FROM place_rtree r JOIN place p ON p.rowid = r.id "
+                    "WHERE r.max_lat >= :south AND r.min_lat <= :north "
+                    "AND r.max_lon >= :west AND r.min_lon <= :east "
+                    "ORDER BY (p.latitude - :lat) * (p.latitude - :lat) "
+                    "+ (CASE WHEN abs(p.longitude - :lon) > 180 "
+                    "THEN 360 - abs(p.longitude - :lon) "
+                    "ELSE abs(p.longitude - :lon) END) "
+                    "* (CASE WHEN abs(p.longitude - :lon) > 180 "
+                    "THEN 360 - abs(p.longitude - :lon) "
+                    "ELSE abs(p.longitude - :lon) END) "
+                    "* :lon_scale * :lon_scale "
+                    "LIMIT :max_candidates"
+                ), params).all()
+            else:
+                d_lat = Place.latitude - lat
+                d_lon = func.abs(Place.longitude - lon)
+                d_lon = case((d_lon > 180, 360 - d_lon), else_=d_lon)
+                candidates += (
+                    db.session.query(Place.id, Place.latitude,
+                                     Place.longitude)
+                    .filter(Place.latitude.between(south, north),
+                            Place.longitude.between(west, east))
+                    .order_by(d_lat * d_lat
+                              + d_lon * d_lon * lon_scale * lon_scale)
+                    .limit(max_candidates)
+                    .all()
+                )
+
+        distances = {}
+        for place_id, place_lat, place_lon in candidates:
+            distance = haversine_km(lat, lon, place_lat, place_lon)
+            if distance <= radius_km:
+                distances[place_id] = distance
+        nearest = sorted(distances, key=distances.get)[:limit]
+        if not nearest:
+            return []
+
+        places = {
+            place.id: place for place in
+            Place.query.options(selectinload(Place.amenities))
+            .filter(Place.id.in_(nearest))
+        }
+        return [(places[place_id], distances[place_id])
+                for place_id in nearest if place_id in places]
+
+    def search_places(self, search, limit, cursor=None):
+        """
+        Full-text search of the places on their title and description,
+        best matches first. Every word must match, the last one as a
+        prefix. Returns one page and the next page cursor.
+        """
+        offset = 0
+        if cursor:
+            (offset,) = decode_cursor(cursor, size=1)
+            if not isinstance(offset, int) or offset < 0:
+                raise ValueError("Invalid cursor")
+        words = re.findall(r'\w+', search)
+        if not words:
+            raise ValueError("The search must contain at least one word")
+
+        if current_app.config.get('SEARCH_INDEX'):
+            match = ' '.join(f'"{word}"' for word in words) + '*'
+            place_ids = [place_id for (place_id,) in db.session.execute(text(
+                "SELECT p.id FROM place_fts "
+                "JOIN place p ON p.rowid = place_fts.rowid "
+                "WHERE place_fts MATCH :match ORDER BY place_fts.rank "
+                "LIMIT :limit OFFSET :offset"
+            ), {'match': match, 'limit': limit + 1, 'offset': offset})]
+        else:
+            query = db.session.query(Place.id)
+            for word in words:
+                query = query.filter(or_(Place.title.ilike(f'%{word}%'),
+                                         Place.description.ilike(
+                                             f'%{word}%')))
+            place_ids = [place_id for (place_id,) in
+                         query.order_by(Place.title, Place.id)
+                         .limit(limit + 1).offset(offset)]
+
+        next_cursor = None
+        if len(place_ids) > limit:
+            place_ids = place_ids[:limit]
+            next_cursor = encode_cursor([offset + limit])
+        places = {
+            place.id: place for place in
+            Place.query.options(selectinload(Place.amenities))
+            .filter(Place.id.in_(place_ids))
+        }
+        return ([places[place_id] for place_id in place_ids
+                 if place_id in places], next_cursor)
 
     def create_place(self, place_data):
         """
         Create a new place and validate amenities existence.
+        With PLACE_PHOTOS_ASYNC, the photos are left pending for the
+        photos job instead of being checked here.
         """
-        place_in = PlaceCreate(**place_data)
+        place_in = PlaceCreate.model_validate(
+            place_data, context={'defer_photos': self.defer_photo_checks})
 
         amenities = []
         for amenity_id in place_in.amenity_ids or []:
@@ -164,11 +460,68 @@ class HBnBFacade:
             longitude=place_in.longitude,
             owner_id=place_in.owner_id,
             amenities=amenities,
-            photos_url=photos
+            photos_url=photos,
+            photos_status=(PHOTOS_PENDING if photos and self.defer_photo_checks
+                           else PHOTOS_CHECKED)
         )
         self.place_repo.add(place)
         return place
 
+    def create_places(self, places_data):
+        """
+        Create many places at once, with one insert for the places and
+        one for their amenity links. The photos of all the places are
+        checked together, unless PLACE_PHOTOS_ASYNC leaves them pending.
+        Returns the list of new place IDs.
+        """
+        places_in = [PlaceCreate.model_validate(
+            place_data, context={'defer_photos': True})
+            for place_data in places_data]
+        if not self.defer_photo_checks:
+            image_validator.validate_many(
+                [url for place_in in places_in
+                 for url in place_in.photos_url or []])
+
+        amenity_ids = {str(amenity_id) for place_in in places_in
+                       for amenity_id in place_in.amenity_ids or []}
+        known_ids = set()
+        if amenity_ids:
+            known_ids = {
+                amenity_id for (amenity_id,) in
+                db.session.query(Amenity.id)
+                .filter(Amenity.id.in_(amenity_ids))
+            }
+        missing = amenity_ids - known_ids
+        if missing:
+            raise ValueError(f'Amenity {sorted(missing)[0]} not found')
+
+        place_rows = []
+        amenity_rows = []
+        for place_in in places_in:
+            place_id = str(uuid4())
+            place_rows.append({
+                'id': place_id,
+                'title': place_in.title,
+                'description': place_in.description,
+                'price': place_in.price,
+                'latitude': place_in.latitude,
+                'longitude': place_in.longitude,
+                'owner_id': place_in.owner_id,
+                'photos_url': list(place_in.photos_url or []),
+                'photos_status': (PHOTOS_PENDING if place_in.photos_url
+                                  and self.defer_photo_checks
+                                  else PHOTOS_CHECKED)
+            })
+            for amenity_id in set(place_in.amenity_ids or []):
+                amenity_rows.append({'place_id': place_id,
+                                     'amenity.id': str(amenity_id)})
+
+        with unit_of_work():
+            self.place_repo.add_many(place_rows)
+            if amenity_rows:
+                db.session.execute(place_amenities.insert(), amenity_rows)
+        return [row['id'] for row in place_rows]
+
     def get_place(self, place_id):
         """Retrieve place by ID."""
         return self.place_repo.get(place_id)
@@ -203,17 +556,17 @@ class HBnBFacade:
             update_data.pop('amenity_ids')
         
         if "photos_url" in update_data:
-            current_photos = {str(url) for url in place.photos_url}
-            new_photos = set(update_data["photos_url"])
-
-            photos_to_add = new_photos - current_photos
-            photos_to_remove = current_photos - new_photos
-
-            updated_photos = [url for url in place.photos_url if
-                              str(url) not in photos_to_remove]
-
-            for photo in photos_to_add:
-                updated_photos.append(photo)
+            current_photos = {str(url) for url in place.photos_url or []}
+            new_photos = list(dict.fromkeys(
+                str(url) for url in update_data["photos_url"]))
+
+            # Only the added photos were checked, by PlaceUpdate; with
+            # PLACE_PHOTOS_ASYNC they are left for the photos job
+            photos_to_add = [url for url in new_photos
+                             if url not in current_photos]
+            update_data["photos_url"] = new_photos
+            if photos_to_add and self.defer_photo_checks:
+                update_data["photos_status"] = PHOTOS_PENDING
 
         self.place_repo.update(place_id, update_data)
         return self.place_repo.get(place_id)
@@ -267,6 +620,13 @@ class HBnBFacade:
         self.amenity_repo.update(amenity_id, amenity_data)
         return self.amenity_repo.get(amenity_id)
 
+    def update_amenities(self, amenity_ids, amenity_data):
+        """
+        Apply the same update to many amenities at once.
+        Returns the number of updated amenities.
+        """
+        return self.amenity_repo.update_many(amenity_ids, amenity_data)
+
     def delete_amenity(self, amenity_id):
         """Delete an amenity by ID."""
         amenity = self.amenity_repo.get(amenity_id)
@@ -283,20 +643,16 @@ class HBnBFacade:
         One review per booking.
         """
         booking = self.get_booking(booking_id)
-        reviews = self.review_repo.get_all()
         user = self.get_user(user_id)
-        for review in reviews:
-            if review.booking == booking_id:
-                raise PermissionError(
-                    "User can review a place once per booking."
-                    )
 
-        if not self.user_repo.get(user_id):
+        if not user:
             raise ValueError("User not found")
         if not self.place_repo.get(place_id):
             raise ValueError("Place not found")
         if not booking:
             raise ValueError("Booking not found")
+        if self.has_review_for_booking(booking_id):
+            raise PermissionError("User can review a place once per booking.")
 
         end_date_aware = ensure_aware(booking.end_date)
 
@@ -314,9 +670,25 @@ class HBnBFacade:
             user_last_name=user.last_name,
             user_first_name=user.first_name
         )
-        self.review_repo.add(new_review)
+        try:
+            with unit_of_work():
+                self.review_repo.add(new_review)
+                self.update_place_rating(place_id, new_review.rating, 1)
+        except IntegrityError:
+            # A concurrent request reviewed the same booking first
+            db.session.rollback()
+            raise PermissionError("User can review a place once per booking.")
         return new_review
 
+    def has_review_for_booking(self, booking_id):
+        """
+        Check if a booking was already reviewed, with a probe on
+        uq_reviews_booking.
+        """
+        return db.session.query(
+            Review.query.filter(Review.booking == str(booking_id)).exists()
+        ).scalar()
+
     def get_review(self, review_id):
         """Retrieve review by ID."""
         return self.review_repo.get(review_id)
@@ -329,6 +701,14 @@ class HBnBFacade:
         """Retrieve all reviews for a specific place."""
         return Review.query.filter(Review.place == str(place_id)).all()
 
+    def get_reviews_page_by_place(self, place_id, limit, cursor=None):
+        """
+        Retrieve one page of reviews for a specific place
+        and the next page cursor.
+        """
+        query = Review.query.filter(Review.place == str(place_id))
+        return self.review_repo.get_page(limit, cursor, query)
+
     def update_review(self, review_id, review_data):
         """
         Update an existing review.
@@ -336,7 +716,12 @@ class HBnBFacade:
         review = self.review_repo.get(review_id)
         if not review:
             return None
-        self.review_repo.update(review_id, review_data)
+        old_rating = review.rating
+        with unit_of_work():
+            self.review_repo.update(review_id, review_data)
+            if review.rating != old_rating:
+                self.update_place_rating(review.place,
+                                         review.rating - old_rating, 0)
         return self.review_repo.get(review_id)
 
     def delete_review(self, review_id):
@@ -344,30 +729,101 @@ class HBnBFacade:
         review = self.review_repo.get(review_id)
         if not review:
             return None
-        self.review_repo.delete(review_id)
+        with unit_of_work():
+            self.update_place_rating(review.place, -review.rating, -1)
+            self.review_repo.delete(review_id)
         return ''
 
+    def update_place_rating(self, place_id, rating_delta, count_delta):
+        """
+        Apply a review change to the running rating sum and count of a
+        place and recompute its average, with one UPDATE statement and
+        without loading the reviews of the place. The rating is derived
+        data, so updated_at is left as it is.
+        """
+        rating_sum = Place.rating_sum + rating_delta
+        review_count = Place.review_count + count_delta
+        db.session.execute(
+            update(Place)
+            .where(Place.id == str(place_id))
+            .values(
+                updated_at=Place.updated_at,
+                rating_sum=rating_sum,
+                review_count=review_count,
+                rating=case(
+                    (review_count > 0,
+                     func.round(rating_sum / review_count, 1)),
+                    else_=0.0
+                )
+            )
+            .execution_options(synchronize_session=False)
+        )
+        place = db.session.identity_map.get(
+            (Place, (str(place_id),), None))
+        if place is not None:
+            db.session.expire(place, ['rating', 'rating_sum',
+                                      'review_count'])
+        self.place_repo.invalidate([place_id])
+        save_changes()
+
     # ------------------ Booking management ------------------
 
     def create_booking(self, user_id, place_id, booking_data):
         """
         Create a new booking for a place by a user.
+        Raises ValueError if the dates overlap a pending booking.
         """
         if not self.user_repo.get(user_id):
             raise ValueError("User not found")
         if not self.place_repo.get(place_id):
             raise ValueError("Place not found")
-        new_booking = Booking(
-            id=str(uuid.uuid4()),
-            place=place_id,
-            user=user_id,
-            start_date=booking_data.start_date,
-            end_date=booking_data.end_date,
-            status=BookingStatus.PENDING.value
-        )
-        self.booking_repo.add(new_booking)
+        start_date = ensure_naive_utc(booking_data.start_date)
+        end_date = ensure_naive_utc(booking_data.end_date)
+        with unit_of_work():
+            self.lock_place(place_id)
+            if self.has_overlapping_booking(place_id, start_date, end_date):
+                raise ValueError("Already booked")
+            new_booking = Booking(
+                id=str(uuid.uuid4()),
+                place=place_id,
+                user=user_id,
+                start_date=start_date,
+                end_date=end_date,
+                status=BookingStatus.PENDING.value
+            )
+            self.booking_repo.add(new_booking)
+            self.set_availability(place_id,
+                                  *booked_range(start_date, end_date))
         return new_booking
 
+    def lock_place(self, place_id):
+        """
+        Write-lock the place row until the end of the transaction, so
+        that concurrent bookings of the same place run one after the
+        other. The row is written back unchanged, updated_at included.
+        """
+        db.session.execute(
+            update(Place)
+            .where(Place.id == str(place_id))
+            .values(id=Place.id, updated_at=Place.updated_at)
+            .execution_options(synchronize_session=False)
+        )
+        self.place_repo.invalidate([place_id])
+
+    def has_overlapping_booking(self, place_id, start_date, end_date):
+        """
+        Check if a pending booking of the place overlaps the given dates,
+        with a single query on ix_bookings_place_status_dates.
+        """
+        return db.session.query(
+            Booking.query.filter(
+                Booking.place == str(place_id),
+                Booking.status == BookingStatus.PENDING.value,
+                Booking.start_date < ensure_naive_utc(end_date),
+                Booking.end_date > ensure_naive_utc(start_date)
+            ).exists()
+        ).scalar()
+
     def get_booking(self, booking_id):
         """Retrieve booking by ID."""
         return self.booking_repo.get(booking_id)
@@ -376,6 +832,10 @@ class HBnBFacade:
         """Retrieve all bookings."""
         return self.booking_repo.get_all()
 
+    def get_bookings_page(self, limit, cursor=None):
+        """Retrieve one page of bookings and the next page cursor."""
+        return self.booking_repo.get_page(limit, cursor)
+
     def get_booking_list_by_place(self, place_id):
         """Retrieve all bookings for a specific place."""
         return (
@@ -401,6 +861,49 @@ class HBnBFacade:
             .all()
         )
 
+    def get_owner_pending_bookings_page(self, owner_id, limit, cursor=None):
+        """
+        Retrieve one page of the pending bookings of all the places of
+        an owner, and the next page cursor. The owned places are joined
+        as a subquery so that SQLite starts from ix_place_owner_id, then
+        looks the bookings up by place and status.
+        """
+        owned_places = (db.session.query(Place.id)
+                        .filter(Place.owner_id == str(owner_id)))
+        query = Booking.query.filter(
+            Booking.place.in_(owned_places.scalar_subquery()),
+            Booking.status == BookingStatus.PENDING.value)
+        return self.booking_repo.get_page(limit, cursor, query)
+
+    def delete_bookings(self, booking_ids):
+        """
+        Purge many bookings at once, with their reviews, whose ratings
+        are taken off their places.
+        Returns the number of deleted bookings.
+        """
+        booking_ids = [str(booking_id) for booking_id in booking_ids]
+        stays = (db.session.query(Booking.place, Booking.start_date,
+                                  Booking.end_date)
+                 .filter(Booking.id.in_(booking_ids))
+                 .all())
+        reviews = (db.session.query(Review.id, Review.place, Review.rating)
+                   .filter(Review.booking.in_(booking_ids))
+                   .all())
+        ratings = {}
+        for _, place_id, rating in reviews:
+            rating_sum, review_count = ratings.get(place_id, (0, 0))
+            ratings[place_id] = (rating_sum + rating, review_count + 1)
+        with unit_of_work():
+            for place_id, (rating_sum, review_count) in ratings.items():
+                self.update_place_rating(place_id, -rating_sum,
+                                         -review_count)
+            if reviews:
+                self.review_repo.delete_many(
+                    [review_id for review_id, _, _ in reviews])
+            count = self.booking_repo.delete_many(booking_ids)
+            self.refresh_availability(stays)
+        return count
+
     def cancel_booking(self, booking_id):
         """
         Cancel a booking.
@@ -408,7 +911,11 @@ class HBnBFacade:
         """
         booking = self.get_booking(booking_id)
         if booking.status == BookingStatus.PENDING.value:
-            booking.set_status(BookingStatus.CANCELLED.value)
+            with unit_of_work():
+                booking.set_status(BookingStatus.CANCELLED.value)
+                save_changes()
+                self.refresh_availability(
+                    [(booking.place, booking.start_date, booking.end_date)])
         return booking
 
     def update_booking(self, booking_id, booking_data):
@@ -432,9 +939,169 @@ class HBnBFacade:
             if booking_data['status'] not in ("DONE", "PENDING", "CANCELLED"):
                 raise ValueError("Status must be DONE, PENDING, or CANCELLED")
 
-        self.booking_repo.update(booking_id, booking_data)
+        for key in ('start_date', 'end_date'):
+            if booking_data.get(key) is not None:
+                booking_data[key] = ensure_naive_utc(booking_data[key])
+        stays = [(place_id, booking.start_date, booking.end_date)]
+        with unit_of_work():
+            self.booking_repo.update(booking_id, booking_data)
+            stays.append((place_id, booking.start_date, booking.end_date))
+            self.refresh_availability(stays)
         return self.booking_repo.get(booking_id)
+
+    # ------------------ Availability management ------------------
+
+    def get_availability_rows(self, place_id, first, last):
+        """
+        Retrieve the availability rows of a place for the years of the
+        days [first, last), keyed by year.
+        """
+        rows = Availability.query.filter(
+            Availability.place_id == str(place_id),
+            Availability.year.between(first.year, last.year)
+        ).all()
+        return {row.year: row for row in rows}
+
+    def set_availability(self, place_id, first, last, booked=True):
+        """
+        Mark the days [first, last) of a place as taken or free.
+        """
+        rows = self.get_availability_rows(place_id, first, last)
+        self.apply_availability(rows, place_id, first, last, booked)
+        save_changes()
+
+    def apply_availability(self, rows, place_id, first, last, booked=True):
+        """
+        Set the days [first, last) on the given rows of a place,
+        adding the missing years to the rows and the session.
+        """
+        for year, year_first, year_last in split_by_year(first, last):
+            row = rows.get(year)
+            if row is None:
+                if not booked:
+                    continue
+                row = rows[year] = Availability(
+                    place_id=str(place_id), year=year)
+                db.session.add(row)
+            row.set_days(year_first, year_last, booked)
+
+    def refresh_availability(self, stays):
+        """
+        Recompute the days of the given (place, start, end) stays from
+        the bookings still holding them, after a booking was cancelled,
+        moved or deleted. Other bookings may share some of these days.
+        """
+        for place_id, start_date, end_date in stays:
+            self.lock_place(place_id)
+            first, last = booked_range(start_date, end_date)
+            holders = (db.session.query(Booking.start_date, Booking.end_date)
+                       .filter(Booking.place == str(place_id),
+                               Booking.status != BookingStatus.CANCELLED.value,
+                               Booking.start_date < datetime.combine(
+                                   last, datetime.min.time()),
+                               Booking.end_date > datetime.combine(
+                                   first, datetime.min.time()))
+                       .all())
+            rows = self.get_availability_rows(place_id, first, last)
+            self.apply_availability(rows, place_id, first, last, False)
+            for holder_start, holder_end in holders:
+                holder_first, holder_last = booked_range(holder_start,
+                                                         holder_end)
+                self.apply_availability(rows, place_id,
+                                        max(first, holder_first),
+                                        min(last, holder_last))
+        save_changes()
+
+    def get_booked_days(self, place_id, first, last):
+        """
+        List the taken days of a place among the days [first, last),
+        reading one bitset per year.
+        """
+        rows = self.get_availability_rows(place_id, first, last)
+        booked = []
+        for year, year_first, year_last in split_by_year(first, last):
+            if year in rows:
+                booked.extend(rows[year].booked_days(year_first, year_last))
+        return booked
+
+    def is_available(self, place_id, first, last):
+        """Check if none of the days [first, last) of a place is taken."""
+        return not self.get_booked_days(place_id, first, last)
+
+    def rebuild_availability(self):
+        """
+        Rebuild the availability calendar of every place from the
+        bookings that are not cancelled.
+        """
+        Availability.query.delete()
+        bookings = (db.session.query(Booking.place, Booking.start_date,
+                                     Booking.end_date)
+                    .filter(Booking.status != BookingStatus.CANCELLED.value)
+                    .all())
+        rows = {}
+        for place_id, start_date, end_date in bookings:
+            self.apply_availability(rows.setdefault(place_id, {}), place_id,
+                                    *booked_range(start_date, end_date))
+        db.session.commit()
     
+    def complete_past_bookings(self):
+        """
+        Mark every pending booking that has ended as done, with one
+        UPDATE statement. Returns the number of updated bookings.
+        """
+        now = datetime.now(timezone.utc)
+        result = db.session.execute(
+            update(Booking)
+            .where(Booking.status == BookingStatus.PENDING.value,
+                   Booking.end_date < ensure_naive_utc(now))
+            .values(status=BookingStatus.DONE.value, updated_at=now)
+            .execution_options(synchronize_session=False)
+        )
+        save_changes()
+        return result.rowcount
+
+    def check_pending_photos(self, batch_size=50):
+        """
+        Check the photos of the places created with pending photos, and
+        replace the ones that are not images, or could not be checked,
+        with the default photo. The photos are fetched outside of any
+        transaction; a place given new photos meanwhile stays pending for
+        the next run. Returns the number of places checked.
+        """
+        places = (db.session.query(Place.id, Place.photos_url)
+                  .filter(Place.photos_status == PHOTOS_PENDING)
+                  .limit(batch_size).all())
+        db.session.rollback()
+        if not places:
+            return 0
+        verdicts = image_validator.verdicts(
+            {str(url) for _, photos in places for url in photos or []})
+
+        checked = 0
+        for place_id, _ in places:
+            self.lock_place(place_id)
+            photos, status = (db.session.query(Place.photos_url,
+                                               Place.photos_status)
+                              .filter(Place.id == place_id).one())
+            if status != PHOTOS_PENDING or any(
+                    str(url) not in verdicts for url in photos or []):
+                continue
+            kept = []
+            for url in photos or []:
+                url = str(url) if verdicts[str(url)] else DEFAULT_PLACE_PHOTO_URL
+                if url not in kept:
+                    kept.append(url)
+            db.session.execute(
+                update(Place)
+                .where(Place.id == place_id)
+                .values(photos_url=kept, photos_status=PHOTOS_CHECKED)
+                .execution_options(synchronize_session=False)
+            )
+            self.place_repo.invalidate([place_id])
+            checked += 1
+        save_changes()
+        return checked
+
     def manage_bookingstatus(self, booking_id):
 
         booking = self.get_booking(booking_id)
@@ -446,3 +1113,56 @@ class HBnBFacade:
             booking.set_status(BookingStatus.DONE.value)
             self.booking_repo.update(booking_id, booking.__dict__)
         return booking.status
+
+    # ------------------ Idempotency keys ------------------
+
+    def get_idempotency_key(self, user_id, key):
+        """
+        Retrieve the stored response of a request sent with an
+        Idempotency-Key header, or None if there is none or it expired.
+        """
+        stored = db.session.get(IdempotencyKey, (str(user_id), key))
+        now = ensure_naive_utc(datetime.now(timezone.utc))
+        if stored is not None and stored.expires_at < now:
+            db.session.delete(stored)
+            save_changes()
+            return None
+        return stored
+
+    def reserve_idempotency_key(self, user_id, key, fingerprint):
+        """
+        Claim an Idempotency-Key before serving its request.
+        Raises IntegrityError if a concurrent request claimed it first.
+        """
+        stored = IdempotencyKey(
+            user_id=str(user_id),
+            key=key,
+            fingerprint=fingerprint,
+            expires_at=ensure_naive_utc(datetime.now(timezone.utc)
+                                        + current_app.config[
+                                            'IDEMPOTENCY_KEY_TTL'])
+        )
+        db.session.add(stored)
+        db.session.flush()
+        return stored
+
+    def store_idempotent_response(self, stored, status_code, response):
+        """
+        Keep the response served for a claimed Idempotency-Key.
+        """
+        stored.status_code = status_code
+        stored.response = response
+        save_changes()
+
+    def purge_idempotency_keys(self):
+        """
+        Delete the expired Idempotency-Keys.
+        Returns the number of deleted keys.
+        """
+        result = db.session.execute(
+            delete(IdempotencyKey)
+            .where(IdempotencyKey.expires_at
+                   < ensure_naive_utc(datetime.now(timezone.utc)))
+        )
+        db.session.commit()
+        return result.rowcount
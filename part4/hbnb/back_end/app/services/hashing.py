@@ -0,0 +1,118 @@
+'''
+This module runs the Argon2 password hashing and verification in a
+bounded pool of threads. Each Argon2 call takes about 64 MB and a full
+core, so only a few of them run at once and a limited number may wait:
+past that, requests are refused with HashingOverloaded instead of
+piling up and starving the other endpoints.
+'''
+from concurrent.futures import ThreadPoolExecutor
+from threading import BoundedSemaphore, Lock
+import time
+
+
+class HashingOverloaded(Exception):
+    '''
+    Raised when the hashing pool and its queue are full.
+    '''
+    def __init__(self, retry_after):
+        super().__init__("Too many password operations, retry later")
+        self.retry_after = retry_after
+
+
+class HashingPool:
+    '''
+    Run the calls of a PasswordHasher on at most workers threads, with
+    at most queue_size calls waiting for a thread.
+    '''
+    def __init__(self, hasher, workers=2, queue_size=8, retry_after=1):
+        self.hasher = hasher
+        self.retry_after = retry_after
+        self.configure(workers, queue_size)
+        self._lock = Lock()
+        self.waiting = 0
+        self.running = 0
+        self.completed = 0
+        self.rejected = 0
+        self.wait_ms = 0.0
+        self.run_ms = 0.0
+        self.max_wait_ms = 0.0
+
+    def configure(self, workers, queue_size):
+        '''
+        Size the pool. Must be called before the first operation.
+        '''
+        if getattr(self, '_executor', None) is not None:
+            self._executor.shutdown(wait=False)
+        self.workers = workers
+        self.queue_size = queue_size
+        self._executor = ThreadPoolExecutor(max_workers=workers,
+                                            thread_name_prefix='argon2')
+        self._slots = BoundedSemaphore(workers + queue_size)
+
+    def hash(self, password):
+        '''
+        Hash a password.
+        '''
+        return self._submit(self.hasher.hash, password)
+
+    def verify(self, hashed_password, password):
+        '''
+        Check a password against its hash.
+        Raises VerifyMismatchError if it does not match.
+        '''
+        return self._submit(self.hasher.verify, hashed_password, password)
+
+    def _submit(self, func, *args):
+        '''
+        Run func in the pool and wait for its result, or raise
+        HashingOverloaded if the pool and its queue are full.
+        '''
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise HashingOverloaded(self.retry_after)
+        try:
+            with self._lock:
+                self.waiting += 1
+            submitted = time.perf_counter()
+            return self._executor.submit(self._run, submitted, func,
+                                         *args).result()
+        finally:
+            self._slots.release()
+
+    def _run(self, submitted, func, *args):
+        '''
+        Run func on a pool thread and record its timings.
+        '''
+        started = time.perf_counter()
+        wait_ms = (started - submitted) * 1000
+        with self._lock:
+            self.waiting -= 1
+            self.running += 1
+            self.wait_ms += wait_ms
+            self.max_wait_ms = max(self.max_wait_ms, wait_ms)
+        try:
+            return func(*args)
+        finally:
+            with self._lock:
+                self.running -= 1
+                self.completed += 1
+                self.run_ms += (time.perf_counter() - started) * 1000
+
+    def stats(self):
+        '''
+        Return the queue depth, counters and average latencies.
+        '''
+        with self._lock:
+            completed = self.completed or 1
+            return {
+                'workers': self.workers,
+                'queue_size': self.queue_size,
+                'running': self.running,
+                'queue_depth': self.waiting,
+                'completed': self.completed,
+                'rejected': self.rejected,
+                'avg_wait_ms': round(self.wait_ms / completed, 2),
+                'max_wait_ms': round(self.max_wait_ms, 2),
+                'avg_run_ms': round(self.run_ms / completed, 2),
+            }
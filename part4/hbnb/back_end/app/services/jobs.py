@@ -0,0 +1,168 @@
+'''
+This module schedules the background jobs of the application.
+Each job runs in a scheduler thread, inside its own app context, and
+records how many rows it handled in its runtime counters. With several
+processes, only the one holding the scheduler lock file runs the jobs.
+'''
+from extensions import scheduler
+from app.services import facade
+from datetime import datetime, timezone
+from threading import Lock
+from utils import purge_expired_tokens
+import fcntl
+import os
+import time
+
+_stats = {}
+_stats_lock = Lock()
+_lock_file = None
+_lock_file_lock = Lock()
+_start_lock = Lock()
+
+
+def holds_job_lock(app):
+    '''
+    Tell if this process runs the jobs. The first process to lock the
+    SCHEDULER_LOCK_FILE keeps it until it exits, then another one takes
+    it over at its next run. Without a lock file, every process runs
+    the jobs.
+    '''
+    global _lock_file
+    if not app.config.get('SCHEDULER_LOCK_FILE'):
+        return True
+    with _lock_file_lock:
+        if _lock_file is not None:
+            return True
+        os.makedirs(app.instance_path, exist_ok=True)
+        lock_file = open(os.path.join(app.instance_path,
+                                      app.config['SCHEDULER_LOCK_FILE']), 'a')
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        _lock_file = lock_file
+        return True
+
+
+def run_job(app, name, task, message):
+    '''
+    Run a job task that returns a number of rows, log it and record it.
+    Nothing is run when another process holds the job lock.
+    '''
+    if not holds_job_lock(app):
+        return
+    with app.app_context():
+        started = time.perf_counter()
+        try:
+            count = task()
+        except Exception:
+            app.logger.exception("Job %s failed", name)
+            count = None
+        duration = (time.perf_counter() - started) * 1000
+
+    with _stats_lock:
+        stats = _stats.setdefault(name, {
+            'runs': 0, 'failures': 0, 'rows': 0, 'last_rows': None,
+            'last_run': None, 'last_duration_ms': None
+        })
+        stats['runs'] += 1
+        stats['last_run'] = datetime.now(timezone.utc).isoformat()
+        stats['last_duration_ms'] = round(duration, 2)
+        if count is None:
+            stats['failures'] += 1
+            return
+        stats['rows'] += count
+        stats['last_rows'] = count
+    if count:
+        app.logger.info(message, count)
+
+
+def job_stats():
+    '''
+    Return a copy of the runtime counters of the jobs.
+    '''
+    with _stats_lock:
+        return {name: dict(stats) for name, stats in _stats.items()}
+
+
+def complete_past_bookings(app):
+    '''
+    Mark every pending booking that has ended as done.
+    '''
+    run_job(app, 'complete_past_bookings', facade.complete_past_bookings,
+            "%d bookings marked as done")
+
+
+def purge_idempotency_keys(app):
+    '''
+    Delete the expired Idempotency-Keys.
+    '''
+    run_job(app, 'purge_idempotency_keys', facade.purge_idempotency_keys,
+            "%d idempotency keys purged")
+
+
+def purge_revoked_tokens(app):
+    '''
+    Delete the expired revoked tokens, in batches.
+    '''
+    run_job(app, 'purge_revoked_tokens',
+            lambda: purge_expired_tokens(
+                app.config['TOKEN_PURGE_BATCH_SIZE']),
+            "%d expired revoked tokens purged")
+
+
+def check_pending_photos(app):
+    '''
+    Check the photos of the places created with pending photos.
+    '''
+    run_job(app, 'check_pending_photos',
+            lambda: facade.check_pending_photos(
+                app.config['PLACE_PHOTOS_BATCH_SIZE']),
+            "%d places had their photos checked")
+
+
+def init_scheduler(app):
+    '''
+    Start the scheduler with the first request the app serves, so that
+    the processes which never serve any, such as the watcher process of
+    the reloader or a CLI command, do not run the jobs.
+    '''
+    if not app.config.get('SCHEDULER_ENABLED', True):
+        return
+
+    @app.before_request
+    def start_scheduler():
+        if scheduler.running:
+            return
+        with _start_lock:
+            if not scheduler.running:
+                start_jobs(app)
+
+
+def start_jobs(app):
+    '''
+    Register the background jobs and start the scheduler.
+    '''
+    scheduler.add_job(
+        complete_past_bookings, 'interval', args=[app],
+        seconds=app.config['BOOKING_STATUS_INTERVAL'],
+        next_run_time=datetime.now(timezone.utc),
+        id='complete_past_bookings', replace_existing=True
+    )
+    scheduler.add_job(
+        purge_idempotency_keys, 'interval', args=[app],
+        seconds=app.config['IDEMPOTENCY_PURGE_INTERVAL'],
+        id='purge_idempotency_keys', replace_existing=True
+    )
+    scheduler.add_job(
+        purge_revoked_tokens, 'interval', args=[app],
+        seconds=app.config['TOKEN_PURGE_INTERVAL'],
+        id='purge_revoked_tokens', replace_existing=True
+    )
+    scheduler.add_job(
+        check_pending_photos, 'interval', args=[app],
+        seconds=app.config['PLACE_PHOTOS_INTERVAL'],
+        id='check_pending_photos', replace_existing=True
+    )
+    scheduler.start()
@@ -1,5 +1,96 @@
 """
-This module just initialize the blacklist set for tokens when
-a user log out.
+This module keeps the revoked tokens in memory, so that the JWT blocklist
+check of each authenticated request does not query the database.
+The cache holds every revoked token that has not expired yet, and is
+reloaded from the revoked_tokens table at a regular interval so that the
+tokens revoked by the other workers are seen too.
 """
-blacklist = set()
+from datetime import datetime, timezone
+from threading import Lock
+from extensions import db
+from app.models.user import RevokedToken
+from app.persistence.repository import save_changes
+import time
+
+
+class RevokedTokenCache:
+    """
+    In-memory copy of the unexpired revoked tokens, jti -> expiry.
+    """
+    def __init__(self, refresh_interval=30):
+        self.refresh_interval = refresh_interval
+        self._tokens = {}
+        self._loaded_at = None
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+        self.reloads = 0
+
+    def is_revoked(self, jti):
+        """
+        Tell if a token was revoked. Only reads the database when the
+        copy is older than refresh_interval seconds.
+        """
+        if self._stale():
+            self.reload()
+        expires_at = self._tokens.get(jti)
+        if expires_at is not None and expires_at > time.time():
+            self.hits += 1
+            return True
+        self.misses += 1
+        return False
+
+    def _stale(self):
+        """
+        Tell if the copy is missing or older than refresh_interval seconds.
+        """
+        return (self._loaded_at is None
+                or time.monotonic() - self._loaded_at > self.refresh_interval)
+
+    def reload(self, force=False):
+        """
+        Replace the copy with the unexpired tokens of the table.
+        The requests waiting on the lock while another one reloads
+        find the copy fresh and skip their own reload, unless forced.
+        """
+        with self._lock:
+            if not force and not self._stale():
+                return
+            now = datetime.now(timezone.utc).replace(tzinfo=None)
+            rows = (db.session.query(RevokedToken.jti,
+                                     RevokedToken.expires_at)
+                    .filter(RevokedToken.expires_at > now).all())
+            self._tokens = {
+                jti: expires_at.replace(tzinfo=timezone.utc).timestamp()
+                for jti, expires_at in rows
+            }
+            self._loaded_at = time.monotonic()
+            self.reloads += 1
+
+    def revoke(self, jti, expires_at):
+        """
+        Revoke a token until its expiry, a UTC timestamp.
+        """
+        db.session.merge(RevokedToken(
+            jti=jti,
+            expires_at=datetime.fromtimestamp(expires_at, timezone.utc)
+            .replace(tzinfo=None)
+        ))
+        save_changes()
+        with self._lock:
+            self._tokens[jti] = expires_at
+
+    def stats(self):
+        """
+        Return the size and hit counters of the cache.
+        """
+        return {
+            'size': len(self._tokens),
+            'refresh_interval': self.refresh_interval,
+            'hits': self.hits,
+            'misses': self.misses,
+            'reloads': self.reloads,
+        }
+
+
+revoked_tokens = RevokedTokenCache()
@@ -15,6 +15,64 @@ class Config:
     JWT_BLACKLIST_ENABLED = True
     JWT_BLACKLIST_TOKEN_CHECKS = ['access', 'refresh']
     OPENCAGE_KEY = "b91687667bcc491281c1cbfd8f028651"
+    # Geocoding answers are fresh for GEOCODE_TTL seconds, then served
+    # for GEOCODE_STALE_TTL more while refreshed in the background.
+    # Reverse lookups are rounded to GEOCODE_PRECISION decimals (~100 m).
+    GEOCODE_TIMEOUT = 5
+    GEOCODE_TTL = 7 * 86400
+    GEOCODE_STALE_TTL = 30 * 86400
+    GEOCODE_PRECISION = 3
+    GEOCODE_CACHE_SIZE = 4096
+    GEOCODE_CACHE_DB = 'geocode_cache.db'
+    # Read-through caches in front of the repositories (ttl in seconds)
+    REPOSITORY_CACHE = {
+        'user': {'maxsize': 1024, 'ttl': 30},
+        'place': {'maxsize': 1024, 'ttl': 30},
+        'amenity': {'maxsize': 256, 'ttl': 300},
+    }
+    # SQL statements per request: same statement repeated more than this
+    # is logged as a possible N+1, X-Query-* headers are sent in debug,
+    # and in strict mode going over an endpoint budget returns a 500.
+    SQL_N_PLUS_ONE_THRESHOLD = 10
+    SQL_QUERY_BUDGET_STRICT = False
+    # Background jobs (intervals in seconds). Each serving process starts
+    # the scheduler, and the one holding the lock file of the instance
+    # folder runs the jobs (None: every process runs them).
+    SCHEDULER_ENABLED = True
+    SCHEDULER_LOCK_FILE = 'scheduler.lock'
+    BOOKING_STATUS_INTERVAL = 60
+    IDEMPOTENCY_PURGE_INTERVAL = 3600
+    TOKEN_PURGE_INTERVAL = 3600
+    TOKEN_PURGE_BATCH_SIZE = 1000
+    # How long a response is replayed for a retried Idempotency-Key
+    IDEMPOTENCY_KEY_TTL = timedelta(hours=24)
+    # How often the in-memory revoked tokens are reloaded (in seconds),
+    # bounds how long a token revoked by another worker stays accepted
+    REVOKED_TOKENS_REFRESH_INTERVAL = 30
+    # Argon2 calls running at once (about 64 MB each) and waiting for a
+    # thread; past that, requests get a 503 with this Retry-After
+    PASSWORD_HASH_WORKERS = 2
+    PASSWORD_HASH_QUEUE = 8
+    PASSWORD_HASH_RETRY_AFTER = 1
+    # Image URL checks: seconds per request, verdict lifetimes (an
+    # invalid URL is checked again sooner), checks at once per host,
+    # in-memory verdicts and the file keeping them in the instance folder
+    IMAGE_CHECK_TIMEOUT = 5
+    IMAGE_VALID_TTL = 86400
+    IMAGE_INVALID_TTL = 600
+    IMAGE_HOST_CONCURRENCY = 4
+    IMAGE_CACHE_SIZE = 4096
+    IMAGE_VERDICTS_DB = 'image_verdicts.db'
+    # The photos of a list are checked by this many threads at once, and
+    # the whole list must be checked within this many seconds
+    IMAGE_CHECK_WORKERS = 8
+    IMAGE_CHECK_DEADLINE = 10
+    # Accept the photos of a new place without waiting for their check:
+    # the place is created with pending photos, checked by a job every
+    # PLACE_PHOTOS_INTERVAL seconds, PLACE_PHOTOS_BATCH_SIZE places a run
+    PLACE_PHOTOS_ASYNC = False
+    PLACE_PHOTOS_INTERVAL = 5
+    PLACE_PHOTOS_BATCH_SIZE = 50
 
 
 class DevelopmentConfig(Config):
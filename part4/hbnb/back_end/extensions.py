@@ -4,6 +4,8 @@ This module contains the base extensions of the application.
 
 from flask_sqlalchemy import SQLAlchemy
 from flask_jwt_extended import JWTManager
+from apscheduler.schedulers.background import BackgroundScheduler
 
 db = SQLAlchemy()
 jwt = JWTManager()
+scheduler = BackgroundScheduler(timezone='UTC')
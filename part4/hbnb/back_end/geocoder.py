@@ -0,0 +1,297 @@
+'''
+This module answers the geocoding requests of the front end through the
+OpenCage API, with a cache in front of it: an in-memory LRU and a small
+SQLite file next to the database. City names are normalized and
+coordinates are rounded to about 100 m before being used as cache keys,
+so that the cards of a listing page share their lookups. An expired
+answer is still served for a while, and refreshed in the background.
+Concurrent misses of the same key share a single call to the API.
+'''
+from app.persistence.cache import LRUCache
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import closing
+from requests.adapters import HTTPAdapter
+from threading import Lock
+import json
+import os
+import requests
+import sqlite3
+import time
+import unicodedata
+
+OPENCAGE_URL = "https://api.opencagedata.com/geocode/v1/json"
+
+# Values of the X-Cache header of the answers
+CACHE_HIT = 'HIT'
+CACHE_STALE = 'STALE'
+CACHE_MISS = 'MISS'
+
+
+def normalize_city(city):
+    '''
+    Return the cache key form of a city query, so that the case, the
+    Unicode form and the spacing of the name do not matter.
+    Raises TypeError if the city is not a string.
+    '''
+    if not isinstance(city, str):
+        raise TypeError("The city name must be a string")
+    return ' '.join(unicodedata.normalize('NFKC', city).casefold().split())
+
+
+class Geocoder:
+    '''
+    Geocode city names and reverse geocode coordinates, with a cache of
+    the answers.
+    '''
+    def __init__(self, api_key=None, timeout=5, ttl=7 * 86400,
+                 stale_ttl=30 * 86400, precision=3, maxsize=4096,
+                 db_path=None):
+        self._lock = Lock()
+        self._refreshing = set()
+        self._inflight = {}
+        self._executor = ThreadPoolExecutor(max_workers=2,
+                                            thread_name_prefix='geocode')
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.fetches = 0
+        self.failures = 0
+        self.configure(api_key, timeout, ttl, stale_ttl, precision, maxsize,
+                       db_path)
+
+    def init_app(self, app):
+        '''
+        Configure the geocoder from the OPENCAGE_KEY and GEOCODE_*
+        settings of the app. The cache file lives in the instance folder.
+        '''
+        db_path = None
+        if app.config['GEOCODE_CACHE_DB']:
+            os.makedirs(app.instance_path, exist_ok=True)
+            db_path = os.path.join(app.instance_path,
+                                   app.config['GEOCODE_CACHE_DB'])
+        self.configure(app.config['OPENCAGE_KEY'],
+                       app.config['GEOCODE_TIMEOUT'],
+                       app.config['GEOCODE_TTL'],
+                       app.config['GEOCODE_STALE_TTL'],
+                       app.config['GEOCODE_PRECISION'],
+                       app.config['GEOCODE_CACHE_SIZE'], db_path)
+
+    def configure(self, api_key, timeout, ttl, stale_ttl, precision,
+                  maxsize, db_path):
+        '''
+        Set the limits, and open the cache file if db_path is given.
+        '''
+        self.api_key = api_key
+        self.timeout = timeout
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.precision = precision
+        self.db_path = db_path
+        self._answers = LRUCache(maxsize, ttl + stale_ttl)
+        self._session = requests.Session()
+        self._session.mount('https://', HTTPAdapter(pool_maxsize=4))
+        if db_path:
+            with closing(sqlite3.connect(db_path, timeout=5)) as conn, conn:
+                conn.execute(
+                    'CREATE TABLE IF NOT EXISTS geocode_cache ('
+                    'key TEXT PRIMARY KEY, status INTEGER NOT NULL, '
+                    'body TEXT NOT NULL, fetched_at REAL NOT NULL)'
+                )
+                conn.execute('DELETE FROM geocode_cache WHERE fetched_at < ?',
+                             (time.time() - ttl - stale_ttl,))
+
+    def geocode(self, city):
+        '''
+        Return (body, status, cache) for a city name: its coordinates, or
+        the choices when the name is ambiguous.
+        '''
+        return self._answer(f'geocode:{normalize_city(city)}',
+                            lambda: self._fetch_geocode(city))
+
+    def reverse_geocode(self, lat, lon):
+        '''
+        Return (body, status, cache) for coordinates: the city, country
+        and address of the rounded coordinates.
+        '''
+        lat = round(float(lat), self.precision)
+        lon = round(float(lon), self.precision)
+        return self._answer(f'reverse:{lat:.{self.precision}f},'
+                            f'{lon:.{self.precision}f}',
+                            lambda: self._fetch_reverse(lat, lon))
+
+    def _answer(self, key, fetch):
+        '''
+        Serve a fresh cached answer, or a stale one while it is refreshed
+        in the background, or fetch it. The misses of a key arriving while
+        it is fetched wait for that fetch instead of calling the API.
+        '''
+        cached = self._cached(key)
+        if cached is not None:
+            body, status, fetched_at = cached
+            if time.time() - fetched_at < self.ttl:
+                with self._lock:
+                    self.hits += 1
+                return body, status, CACHE_HIT
+            with self._lock:
+                self.stale_hits += 1
+                refresh = key not in self._refreshing
+                self._refreshing.add(key)
+            if refresh:
+                self._executor.submit(self._refresh, key, fetch)
+            return body, status, CACHE_STALE
+
+        with self._lock:
+            self.misses += 1
+            inflight = self._inflight.get(key)
+            if inflight is None:
+                inflight = self._inflight[key] = Future()
+                leader = True
+            else:
+                self.coalesced += 1
+                leader = False
+        if not leader:
+            body, status = inflight.result()
+            return body, status, CACHE_MISS
+
+        try:
+            # A fetch of the key may have ended since the first lookup
+            cached = self._answers.get(key)
+            if cached is not None:
+                body, status = cached[0], cached[1]
+            else:
+                body, status = self._fetch(key, fetch)
+        except Exception as e:
+            inflight.set_exception(e)
+            raise
+        else:
+            inflight.set_result((body, status))
+        finally:
+            with self._lock:
+                del self._inflight[key]
+        return body, status, CACHE_MISS
+
+    def _cached(self, key):
+        '''
+        Return the (body, status, fetched_at) stored for key, from memory
+        or from the cache file, or None if it is missing or too old.
+        '''
+        cached = self._answers.get(key)
+        if cached is not None or not self.db_path:
+            return cached
+        with closing(sqlite3.connect(self.db_path, timeout=5)) as conn:
+            row = conn.execute(
+                'SELECT body, status, fetched_at FROM geocode_cache '
+                'WHERE key = ? AND fetched_at > ?',
+                (key, time.time() - self.ttl - self.stale_ttl)
+            ).fetchone()
+        if row is None:
+            return None
+        cached = (json.loads(row[0]), row[1], row[2])
+        self._answers.set(key, cached, ttl=row[2] + self.ttl
+                          + self.stale_ttl - time.time())
+        return cached
+
+    def _fetch(self, key, fetch):
+        '''
+        Call the API and store its answer in memory and in the cache file.
+        '''
+        with self._lock:
+            self.fetches += 1
+        try:
+            body, status = fetch()
+        except Exception:
+            with self._lock:
+                self.failures += 1
+            raise
+        fetched_at = time.time()
+        self._answers.set(key, (body, status, fetched_at))
+        if self.db_path:
+            with closing(sqlite3.connect(self.db_path, timeout=5)) as conn, \
+                    conn:
+                conn.execute(
+                    'INSERT OR REPLACE INTO geocode_cache '
+                    '(key, status, body, fetched_at) VALUES (?, ?, ?, ?)',
+                    (key, status, json.dumps(body), fetched_at)
+                )
+        return body, status
+
+    def _refresh(self, key, fetch):
+        '''
+        Refresh a stale answer; on failure the stale one is kept.
+        '''
+        try:
+            self._fetch(key, fetch)
+        except Exception:
+            pass
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def _request(self, query, **params):
+        response = self._session.get(OPENCAGE_URL, params={
+            "q": query,
+            "key": self.api_key,
+            "no_annotations": 1,
+            **params
+        }, timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()["results"]
+
+    def _fetch_reverse(self, lat, lon):
+        results = self._request(f"{lat},{lon}", language="fr")
+        if not results:
+            return {"error": "No result found"}, 404
+
+        components = results[0]["components"]
+        city = (components.get("city") or components.get("town")
+                or components.get("village"))
+        return {
+            "city": city,
+            "country": components.get("country"),
+            "display_name": results[0]["formatted"]
+        }, 200
+
+    def _fetch_geocode(self, city):
+        results = self._request(city, language="en", limit=5)
+        if not results:
+            return {"error": "City not found"}, 404
+
+        if len(results) > 1:
+            choices = [
+                {
+                    "lat": result["geometry"]["lat"],
+                    "lon": result["geometry"]["lng"],
+                    "display_name": result["formatted"]
+                }
+                for result in results
+            ]
+            return {"multiple_results": True, "choices": choices}, 200
+        geometry = results[0]["geometry"]
+        return {
+            "multiple_results": False,
+            "lat": geometry["lat"],
+            "lon": geometry["lng"],
+            "display_name": results[0]["formatted"]
+        }, 200
+
+    def stats(self):
+        '''
+        Return the counters of the lookups and of the in-memory cache.
+        '''
+        with self._lock:
+            counters = {
+                'hits': self.hits,
+                'stale_hits': self.stale_hits,
+                'misses': self.misses,
+                'coalesced': self.coalesced,
+                'fetches': self.fetches,
+                'failures': self.failures,
+                'refreshing': len(self._refreshing),
+                'in_flight': len(self._inflight),
+            }
+        counters['cache'] = self._answers.stats()
+        return counters
+
+
+geocoder = Geocoder()
@@ -0,0 +1,278 @@
+'''
+This module checks that a URL points to an image, for the photos of the
+places and the users. The verdicts are kept in memory and in a small
+SQLite file next to the database, so that a URL is only fetched again
+once its verdict has expired: a valid image is trusted for a long time,
+an invalid one is checked again after a few minutes. The checks share a
+pool of HTTP connections and only a few of them hit the same host at
+once. The URLs of a list are checked in parallel, within one deadline
+for the whole list.
+'''
+from app.persistence.cache import LRUCache
+from concurrent.futures import ThreadPoolExecutor, wait
+from contextlib import closing
+from requests.adapters import HTTPAdapter
+from threading import BoundedSemaphore, Lock
+from urllib.parse import urlsplit
+import os
+import requests
+import sqlite3
+import time
+
+INVALID_IMAGE = "The URL is not a valid image"
+CHECK_FAILED = "An error occured while the verification of the image"
+
+
+class ImageValidator:
+    '''
+    Tell if URLs point to images, with a cache of the verdicts.
+    '''
+    def __init__(self, timeout=5, valid_ttl=86400, invalid_ttl=600,
+                 host_concurrency=4, maxsize=4096, db_path=None,
+                 workers=8, deadline=10):
+        self._lock = Lock()
+        self.fetches = 0
+        self.failures = 0
+        self.stored_hits = 0
+        self.deadlines_missed = 0
+        self.configure(timeout, valid_ttl, invalid_ttl, host_concurrency,
+                       maxsize, db_path, workers, deadline)
+
+    def init_app(self, app):
+        '''
+        Configure the validator from the IMAGE_* settings of the app.
+        The verdicts file lives in the instance folder.
+        '''
+        db_path = None
+        if app.config['IMAGE_VERDICTS_DB']:
+            os.makedirs(app.instance_path, exist_ok=True)
+            db_path = os.path.join(app.instance_path,
+                                   app.config['IMAGE_VERDICTS_DB'])
+        self.configure(app.config['IMAGE_CHECK_TIMEOUT'],
+                       app.config['IMAGE_VALID_TTL'],
+                       app.config['IMAGE_INVALID_TTL'],
+                       app.config['IMAGE_HOST_CONCURRENCY'],
+                       app.config['IMAGE_CACHE_SIZE'], db_path,
+                       app.config['IMAGE_CHECK_WORKERS'],
+                       app.config['IMAGE_CHECK_DEADLINE'])
+
+    def configure(self, timeout, valid_ttl, invalid_ttl, host_concurrency,
+                  maxsize, db_path, workers=8, deadline=10):
+        '''
+        Set the limits, and open the verdicts file if db_path is given.
+        '''
+        if getattr(self, '_executor', None) is not None:
+            self._executor.shutdown(wait=False)
+        self._executor = ThreadPoolExecutor(max_workers=workers,
+                                            thread_name_prefix='image-check')
+        self.workers = workers
+        self.deadline = deadline
+        self.timeout = timeout
+        self.valid_ttl = valid_ttl
+        self.invalid_ttl = invalid_ttl
+        self.host_concurrency = host_concurrency
+        self.db_path = db_path
+        self._verdicts = LRUCache(maxsize, valid_ttl)
+        self._hosts = {}
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=32,
+                              pool_maxsize=host_concurrency)
+        self._session.mount('http://', adapter)
+        self._session.mount('https://', adapter)
+        if db_path:
+            with closing(sqlite3.connect(db_path, timeout=5)) as conn, conn:
+                conn.execute(
+                    'CREATE TABLE IF NOT EXISTS image_verdicts ('
+                    'url TEXT PRIMARY KEY, is_image INTEGER NOT NULL, '
+                    'expires_at REAL NOT NULL)'
+                )
+                conn.execute('DELETE FROM image_verdicts WHERE expires_at < ?',
+                             (time.time(),))
+
+    def validate(self, url):
+        '''
+        Return url if it points to an image.
+        Raises ValueError if it does not, or if it could not be checked.
+        '''
+        if not self.is_image(url):
+            raise ValueError(INVALID_IMAGE)
+        return url
+
+    def validate_many(self, urls):
+        '''
+        Return urls if they all point to images, checking the uncached
+        ones in parallel. Raises the ValueError validate would raise for
+        the first bad URL of the list; a URL still unchecked at the
+        deadline counts as a failed check.
+        '''
+        urls = [str(url) for url in urls]
+        verdicts = self.verdicts(urls)
+        for url in urls:
+            if verdicts[url] is None:
+                raise ValueError(CHECK_FAILED)
+            if not verdicts[url]:
+                raise ValueError(INVALID_IMAGE)
+        return urls
+
+    def verdicts(self, urls):
+        '''
+        Return {url: verdict} for urls, checking the uncached ones in
+        parallel within the deadline. The verdict of a URL that could not
+        be checked in time is None.
+        '''
+        deadline = time.monotonic() + self.deadline
+        verdicts = {}
+        futures = {}
+        for url in map(str, urls):
+            if url in verdicts or url in futures:
+                continue
+            verdicts[url] = self._cached(url)
+            if verdicts[url] is None:
+                futures[url] = self._executor.submit(self.is_image, url,
+                                                     deadline)
+        if futures:
+            _, pending = wait(futures.values(), timeout=self.deadline)
+            if pending:
+                with self._lock:
+                    self.deadlines_missed += 1
+        for url, future in futures.items():
+            if future.done() and future.exception() is None:
+                verdicts[url] = future.result()
+        return verdicts
+
+    def is_image(self, url, deadline=None):
+        '''
+        Tell if url points to an image, from the cached verdict if it has
+        not expired. Raises ValueError if the URL could not be checked
+        before the deadline, a time.monotonic() value; such failures are
+        not cached.
+        '''
+        url = str(url)
+        verdict = self._cached(url)
+        if verdict is not None:
+            return verdict
+        verdict = self._fetch(url, deadline)
+        self._store(url, verdict)
+        return verdict
+
+    def _cached(self, url):
+        '''
+        Return the unexpired verdict of url, from memory or from the
+        verdicts file, or None if it must be fetched.
+        '''
+        verdict = self._verdicts.get(url)
+        if verdict is None:
+            verdict = self._load(url)
+        return verdict
+
+    def _load(self, url):
+        '''
+        Read an unexpired verdict from the verdicts file, and keep it in
+        memory for the rest of its lifetime.
+        '''
+        if not self.db_path:
+            return None
+        with closing(sqlite3.connect(self.db_path, timeout=5)) as conn:
+            row = conn.execute(
+                'SELECT is_image, expires_at FROM image_verdicts '
+                'WHERE url = ? AND expires_at > ?', (url, time.time())
+            ).fetchone()
+        if row is None:
+            return None
+        verdict, expires_at = bool(row[0]), row[1]
+        self._verdicts.set(url, verdict, ttl=expires_at - time.time())
+        with self._lock:
+            self.stored_hits += 1
+        return verdict
+
+    def _store(self, url, verdict):
+        '''
+        Keep a fresh verdict in memory and in the verdicts file.
+        '''
+        ttl = self.valid_ttl if verdict else self.invalid_ttl
+        self._verdicts.set(url, verdict, ttl=ttl)
+        if not self.db_path:
+            return
+        with closing(sqlite3.connect(self.db_path, timeout=5)) as conn, conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO image_verdicts '
+                '(url, is_image, expires_at) VALUES (?, ?, ?)',
+                (url, int(verdict), time.time() + ttl)
+            )
+
+    def _host_slots(self, url):
+        '''
+        Return the semaphore bounding the checks running on the host of url.
+        '''
+        host = urlsplit(url).netloc.lower()
+        with self._lock:
+            slots = self._hosts.get(host)
+            if slots is None:
+                slots = self._hosts[host] = BoundedSemaphore(
+                    self.host_concurrency)
+            return slots
+
+    def _fetch(self, url, deadline=None):
+        '''
+        Ask the server of url for the content type: a HEAD request first,
+        then the first KB of the content for the servers refusing HEAD.
+        '''
+        with self._lock:
+            self.fetches += 1
+        slots = self._host_slots(url)
+        if not slots.acquire(timeout=self._timeout(deadline)):
+            self._failed()
+        try:
+            response = self._session.head(url, timeout=self._timeout(deadline),
+                                          allow_redirects=True)
+            if response.status_code == 200 and self._is_image(response):
+                return True
+            with self._session.get(url, headers={'Range': 'bytes=0-1023'},
+                                   timeout=self._timeout(deadline),
+                                   stream=True,
+                                   allow_redirects=True) as response:
+                return (response.status_code in (200, 206)
+                        and self._is_image(response))
+        except requests.RequestException:
+            self._failed()
+        finally:
+            slots.release()
+
+    def _timeout(self, deadline):
+        '''
+        Return the timeout of the next step of a check: the request
+        timeout, cut to what is left before the deadline.
+        '''
+        if deadline is None:
+            return self.timeout
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            self._failed()
+        return min(self.timeout, remaining)
+
+    @staticmethod
+    def _is_image(response):
+        return response.headers.get('Content-Type', '').startswith('image/')
+
+    def _failed(self):
+        with self._lock:
+            self.failures += 1
+        raise ValueError(CHECK_FAILED)
+
+    def stats(self):
+        '''
+        Return the counters of the checks and of the verdict cache.
+        '''
+        with self._lock:
+            counters = {
+                'fetches': self.fetches,
+                'failures': self.failures,
+                'stored_hits': self.stored_hits,
+                'deadlines_missed': self.deadlines_missed,
+                'hosts': len(self._hosts),
+            }
+        counters['cache'] = self._verdicts.stats()
+        return counters
+
+
+image_validator = ImageValidator()
@@ -17,7 +17,14 @@ except subprocess.CalledProcessError as e:
 test_files = [
     "test_users_req.py",
     "test_amenities_req.py",
-    "test_places_req.py"
+    "test_places_req.py",
+    "test_bookings_req.py",
+    "test_photos_req.py",
+    "test_search_req.py",
+    "test_query_budgets.py",
+    "test_indexes.py",
+    "test_geocoder.py",
+    "test_cache.py"
 ]
 
 for file in test_files:
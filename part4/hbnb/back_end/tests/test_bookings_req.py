@@ -0,0 +1,100 @@
+"""
+This module provides a concurrency test for booking creation:
+many parallel requests for the same dates must produce one booking.
+"""
+
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+import threading
+import requests
+
+BASE_URL = "http://localhost:5001/api/v1"
+PARALLEL_REQUESTS = 20
+
+print("========== Running the bookings tests ==========")
+
+
+# Create a new set of users
+def register(email):
+    res = requests.post(f"{BASE_URL}/users", json={
+        "email": email,
+        "password": "123456",
+        "first_name": "User",
+        "last_name": "Test"
+    })
+    print(f"Register {email} => {res.status_code} | {res.json()}")
+
+    if res.status_code == 201:
+        return res.json()["id"]
+    elif (res.status_code == 400 and res.json().get("error")
+          == "Email already registered"):
+        return None
+    else:
+        raise Exception(f"Unexpected response: {res.status_code} - {res.text}")
+
+
+def login(email):
+    session = requests.Session()
+    res = session.post(f"{BASE_URL}/users/login", json={
+        "email": email,
+        "password": "123456"
+    })
+    print(f"Login {email} => {res.status_code}")
+    return session
+
+
+register("owner@example.com")
+register("guest@example.com")
+owner = login("owner@example.com")
+guest = login("guest@example.com")
+
+# Register a new place
+res = owner.post(f"{BASE_URL}/places/", json={
+    "title": "Maison de test des réservations",
+    "description": "Une maison très demandée",
+    "price": 80.0,
+    "latitude": 43.6045,
+    "longitude": 1.4442
+})
+print("Status:", res.status_code)
+place_id = res.json().get("id")
+
+# Book the same dates from many threads at once
+start = datetime.now(timezone.utc) + timedelta(days=30)
+dates = {
+    "start_date": start.isoformat(),
+    "end_date": (start + timedelta(days=3)).isoformat()
+}
+barrier = threading.Barrier(PARALLEL_REQUESTS)
+
+
+def book(_):
+    session = requests.Session()
+    session.cookies.update(guest.cookies)
+    barrier.wait()
+    return session.post(f"{BASE_URL}/bookings/{place_id}", json=dates)
+
+
+with ThreadPoolExecutor(max_workers=PARALLEL_REQUESTS) as pool:
+    responses = list(pool.map(book, range(PARALLEL_REQUESTS)))
+
+statuses = [res.status_code for res in responses]
+print("Statuses:", sorted(statuses))
+assert statuses.count(201) == 1, "Expected exactly one booking"
+assert statuses.count(400) == PARALLEL_REQUESTS - 1, \
+    "Expected every other request to be refused"
+
+res = guest.get(f"{BASE_URL}/bookings/places/{place_id}/pending_booking")
+print("Status:", res.status_code)
+assert len(res.json()) == 1, "Expected one pending booking for the place"
+
+# A booking right after the first one does not overlap
+res = guest.post(f"{BASE_URL}/bookings/{place_id}", json={
+    "start_date": dates["end_date"],
+    "end_date": (start + timedelta(days=5)).isoformat()
+})
+print("Status:", res.status_code)
+assert res.status_code == 201, res.text
+
+print("✅ Bookings tests passed")
@@ -0,0 +1,89 @@
+"""
+This module checks that the repository caches forget the objects deleted
+by a cascade: once an owner is deleted, their places must not be served
+or booked from the place cache.
+It runs the application in process, on a temporary database.
+"""
+
+
+from datetime import datetime, timedelta, timezone
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import config  # noqa: E402
+
+tmp_dir = tempfile.mkdtemp()
+config.DevelopmentConfig.SQLALCHEMY_DATABASE_URI = (
+    'sqlite:///' + os.path.join(tmp_dir, 'cache.db'))
+config.Config.SCHEDULER_ENABLED = False
+config.Config.IMAGE_VERDICTS_DB = None
+config.Config.GEOCODE_CACHE_DB = None
+
+from app import create_app  # noqa: E402
+from app.models.place import Place  # noqa: E402
+from app.services import facade  # noqa: E402
+from extensions import db  # noqa: E402
+
+print("========== Running the cache tests ==========")
+
+app = create_app()
+
+with app.app_context():
+    facade.create_user_admin({"first_name": "Admin", "last_name": "Test",
+                              "email": "admin@example.com",
+                              "password": "123456"})
+    for email in ["owner@example.com", "guest@example.com"]:
+        facade.create_user({"first_name": "User", "last_name": "Test",
+                            "email": email, "password": "123456"})
+
+
+def login(email):
+    client = app.test_client()
+    res = client.post("/api/v1/users/login", json={"email": email,
+                                                   "password": "123456"})
+    assert res.status_code == 200, res.get_data(as_text=True)
+    return client
+
+
+admin = login("admin@example.com")
+owner = login("owner@example.com")
+guest = login("guest@example.com")
+
+res = owner.post("/api/v1/places/", json={
+    "title": "Maison en cache",
+    "description": "Une maison bientôt supprimée",
+    "price": 80.0,
+    "latitude": 43.6045,
+    "longitude": 1.4442
+})
+assert res.status_code == 201, res.get_data(as_text=True)
+place_id = res.get_json()["id"]
+owner_id = res.get_json()["owner_id"]
+
+# Fill the place cache
+res = guest.get(f"/api/v1/places/{place_id}")
+assert res.status_code == 200, res.get_data(as_text=True)
+
+res = admin.delete(f"/api/v1/users/{owner_id}")
+print("Delete owner =>", res.status_code)
+assert res.status_code == 200, res.get_data(as_text=True)
+
+with app.app_context():
+    assert db.session.query(Place).count() == 0, "Expected the place deleted"
+
+res = guest.get(f"/api/v1/places/{place_id}")
+print("Get deleted place =>", res.status_code)
+assert res.status_code == 404, res.get_data(as_text=True)
+
+start = datetime.now(timezone.utc) + timedelta(days=10)
+res = guest.post(f"/api/v1/bookings/{place_id}", json={
+    "start_date": start.isoformat(),
+    "end_date": (start + timedelta(days=2)).isoformat()
+})
+print("Book deleted place =>", res.status_code)
+assert res.status_code != 201, res.get_data(as_text=True)
+
+print("✅ Cache tests passed")
@@ -0,0 +1,85 @@
+"""
+This module checks the geocoding proxy: concurrent misses of a city
+share one call to the API, a city that is not a string and invalid
+coordinates are refused, and an invalid API response is not.
+It runs the application in process, with the API calls replaced.
+"""
+
+
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import config  # noqa: E402
+
+tmp_dir = tempfile.mkdtemp()
+config.DevelopmentConfig.SQLALCHEMY_DATABASE_URI = (
+    'sqlite:///' + os.path.join(tmp_dir, 'geocoder.db'))
+config.Config.SCHEDULER_ENABLED = False
+config.Config.IMAGE_VERDICTS_DB = None
+config.Config.GEOCODE_CACHE_DB = None
+
+from app import create_app  # noqa: E402
+from geocoder import Geocoder, CACHE_HIT, CACHE_MISS  # noqa: E402
+from geocoder import geocoder as app_geocoder  # noqa: E402
+
+print("========== Running the geocoder tests ==========")
+
+app = create_app()
+
+calls = []
+calls_lock = Lock()
+
+
+def slow_fetch(city):
+    with calls_lock:
+        calls.append(city)
+    time.sleep(0.5)
+    return {"multiple_results": False, "lat": 48.85, "lon": 2.35,
+            "display_name": city}, 200
+
+
+geocoder = Geocoder()
+geocoder._fetch_geocode = slow_fetch
+
+# Concurrent misses of the same city, written differently
+with ThreadPoolExecutor(max_workers=8) as executor:
+    answers = list(executor.map(geocoder.geocode,
+                                ["Paris", "paris", " PARIS ", "Paris"] * 2))
+print("API calls:", len(calls), "stats:", geocoder.stats())
+assert len(calls) == 1, "Expected one API call for concurrent misses"
+assert all(answer[:2] == answers[0][:2] for answer in answers)
+assert all(answer[2] == CACHE_MISS for answer in answers)
+assert geocoder.stats()['in_flight'] == 0
+assert geocoder.geocode("Paris")[2] == CACHE_HIT
+
+client = app.test_client()
+for payload in [{"city": 42}, {"city": ["Paris"]}, ["Paris"], {}]:
+    res = client.post("/geocode", json=payload)
+    print(payload, "=>", res.status_code, res.get_json())
+    assert res.status_code == 400, res.get_data(as_text=True)
+
+for payload in [{"lat": "north", "lon": 1.44}, {"lat": 43.6, "lon": None},
+                {"lat": 91, "lon": 1.44}, {"lat": [43.6], "lon": 1.44},
+                ["43.6", "1.44"]]:
+    res = client.post("/reverse-geocode", json=payload)
+    print(payload, "=>", res.status_code, res.get_json())
+    assert res.status_code == 400, res.get_data(as_text=True)
+
+
+def bad_upstream(lat, lon):
+    raise ValueError("Expecting value: line 1 column 1 (char 0)")
+
+
+# A response of the API that is not JSON is not the client's fault
+app_geocoder._fetch_reverse = bad_upstream
+res = client.post("/reverse-geocode", json={"lat": "43.6", "lon": 1.44})
+print("Bad upstream =>", res.status_code, res.get_json())
+assert res.status_code == 500, res.get_data(as_text=True)
+
+print("✅ Geocoder tests passed")
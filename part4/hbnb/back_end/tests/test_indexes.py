@@ -0,0 +1,66 @@
+"""
+This module checks that the SQLite indexes keyed by the place rowid
+follow the places when their rowids are renumbered, as a VACUUM may do.
+It runs the application in process, on a temporary database.
+"""
+
+
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import config  # noqa: E402
+
+tmp_dir = tempfile.mkdtemp()
+config.DevelopmentConfig.SQLALCHEMY_DATABASE_URI = (
+    'sqlite:///' + os.path.join(tmp_dir, 'indexes.db'))
+config.Config.SCHEDULER_ENABLED = False
+config.Config.IMAGE_VERDICTS_DB = None
+config.Config.GEOCODE_CACHE_DB = None
+
+from app import create_app  # noqa: E402
+from app.services import facade  # noqa: E402
+from extensions import db  # noqa: E402
+from sqlalchemy import text  # noqa: E402
+from utils import ensure_spatial_index, ensure_search_index  # noqa: E402
+
+print("========== Running the indexes tests ==========")
+
+app = create_app()
+
+with app.app_context():
+    owner = facade.create_user({"first_name": "Owner", "last_name": "Test",
+                                "email": "owner@example.com",
+                                "password": "123456"})
+    facade.create_places([{
+        "title": f"Maison {city}",
+        "description": f"Une maison à {city}",
+        "price": 50.0,
+        "latitude": latitude,
+        "longitude": longitude,
+        "owner_id": owner.id
+    } for city, latitude, longitude in [("Toulouse", 43.6045, 1.4442),
+                                        ("Lyon", 45.7640, 4.8357),
+                                        ("Brest", 48.3904, -4.4861)]])
+
+    # Renumber the rowids without firing the triggers, as a VACUUM may
+    db.session.execute(text("UPDATE place SET rowid = -rowid"))
+    db.session.execute(text(
+        "UPDATE place SET rowid = (SELECT count(*) FROM place) + 1 + rowid"))
+    db.session.commit()
+
+    ensure_spatial_index()
+    nearby = facade.get_places_nearby(43.6, 1.44, 10, 10)
+    print("Nearby Toulouse:", [place.title for place, _ in nearby])
+    assert [place.title for place, _ in nearby] == ["Maison Toulouse"], \
+        "Expected the spatial index to follow the renumbered places"
+
+    ensure_search_index()
+    found, _ = facade.search_places("brest", 10)
+    print("Search brest:", [place.title for place in found])
+    assert [place.title for place in found] == ["Maison Brest"], \
+        "Expected the full-text index to follow the renumbered places"
+
+print("✅ Indexes tests passed")
@@ -0,0 +1,103 @@
+"""
+This module provides a test for the validation of the photos of a place:
+the URLs of a list are checked in parallel, against a local image server
+answering with an injected latency.
+"""
+
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+import threading
+import time
+import uuid
+import requests
+
+BASE_URL = "http://localhost:5001/api/v1"
+PHOTOS = 8
+LATENCY = 0.5
+
+print("========== Running the photos tests ==========")
+
+
+class StubImageHandler(BaseHTTPRequestHandler):
+    """
+    Answer after ?delay= seconds, with an image unless the path
+    ends with .html.
+    """
+    def do_HEAD(self):
+        query = parse_qs(urlsplit(self.path).query)
+        time.sleep(float(query.get("delay", ["0"])[0]))
+        self.send_response(200)
+        content_type = ("text/html" if urlsplit(self.path).path
+                        .endswith(".html") else "image/png")
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    do_GET = do_HEAD
+
+    def log_message(self, format, *args):
+        pass
+
+
+stub = ThreadingHTTPServer(("127.0.0.1", 0), StubImageHandler)
+stub.daemon_threads = True
+threading.Thread(target=stub.serve_forever, daemon=True).start()
+# A fresh token per run, so that no verdict is already cached
+run = uuid.uuid4().hex
+STUB_URL = f"http://127.0.0.1:{stub.server_port}"
+
+
+def photo(name, delay=LATENCY):
+    return f"{STUB_URL}/{run}/{name}?delay={delay}"
+
+
+requests.post(f"{BASE_URL}/users", json={
+    "email": "photos@example.com",
+    "password": "123456",
+    "first_name": "User",
+    "last_name": "Test"
+})
+session = requests.Session()
+res = session.post(f"{BASE_URL}/users/login", json={
+    "email": "photos@example.com",
+    "password": "123456"
+})
+print("Login =>", res.status_code)
+
+place = {
+    "title": "Maison aux photos",
+    "description": "Une maison avec beaucoup de photos",
+    "price": 80.0,
+    "latitude": 43.6045,
+    "longitude": 1.4442
+}
+
+# The photos are checked in parallel, not one after another
+urls = [photo(f"{i}.png") for i in range(PHOTOS)]
+started = time.perf_counter()
+res = session.post(f"{BASE_URL}/places/", json={**place, "photos_url": urls})
+elapsed = time.perf_counter() - started
+print("Status:", res.status_code, f"in {elapsed:.2f}s")
+assert res.status_code == 201, res.text
+assert elapsed < PHOTOS * LATENCY / 2, "Expected the photos checked in parallel"
+
+# An invalid photo still fails the whole list
+res = session.post(f"{BASE_URL}/places/", json={
+    **place, "photos_url": [photo("0.png"), photo("page.html")]
+})
+print("Status:", res.status_code, res.json())
+assert res.status_code == 400, res.text
+assert "not a valid image" in res.text
+
+# A host too slow for the deadline fails the check instead of hanging
+started = time.perf_counter()
+res = session.post(f"{BASE_URL}/places/", json={
+    **place, "photos_url": [photo("0.png"), photo("slow.png", delay=30)]
+})
+elapsed = time.perf_counter() - started
+print("Status:", res.status_code, f"in {elapsed:.2f}s")
+assert res.status_code == 400, res.text
+assert elapsed < 20, "Expected the check to stop at the deadline"
+
+print("✅ Photos tests passed")
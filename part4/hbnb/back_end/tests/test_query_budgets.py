@@ -0,0 +1,164 @@
+"""
+This module checks the query budgets of the read endpoints: each one is
+called on a populated database, with and without pagination, and must
+stay within the budget it declares in its X-Query-Budget header.
+It runs the application in process, on a temporary database.
+"""
+
+
+from datetime import datetime, timedelta, timezone
+from uuid import uuid4
+import logging
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import config  # noqa: E402
+
+tmp_dir = tempfile.mkdtemp()
+config.DevelopmentConfig.SQLALCHEMY_DATABASE_URI = (
+    'sqlite:///' + os.path.join(tmp_dir, 'budgets.db'))
+config.Config.SCHEDULER_ENABLED = False
+config.Config.SQL_QUERY_BUDGET_STRICT = True
+config.Config.SQL_QUERY_HEADERS = True
+config.Config.IMAGE_VERDICTS_DB = None
+config.Config.GEOCODE_CACHE_DB = None
+
+from app import create_app  # noqa: E402
+from app.services import facade  # noqa: E402
+from app.models.amenity import Amenity  # noqa: E402
+from app.models.booking import Booking  # noqa: E402
+from app.models.review import Review  # noqa: E402
+from app.models.user import User  # noqa: E402
+from extensions import db  # noqa: E402
+
+# More places than the 500 rows loaded by one selectin query, so that an
+# unpaginated listing goes over its budget
+PLACES = 1200
+GUESTS = 30
+REVIEWS = 40
+PENDING_BOOKINGS = 50
+
+print("========== Running the query budgets tests ==========")
+
+app = create_app()
+
+
+class WarningCounter(logging.Handler):
+    def __init__(self):
+        super().__init__(logging.WARNING)
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append(record.getMessage())
+
+
+warnings = WarningCounter()
+app.logger.addHandler(warnings)
+
+# Populate the database
+now = datetime.now(timezone.utc).replace(tzinfo=None)
+with app.app_context():
+    facade.create_user_admin({"first_name": "Admin", "last_name": "Test",
+                              "email": "admin@example.com",
+                              "password": "123456"})
+    owner = facade.create_user({"first_name": "Owner", "last_name": "Test",
+                                "email": "owner@example.com",
+                                "password": "123456"})
+    owner_id = owner.id
+    guests = [User(id=str(uuid4()), first_name="Guest", last_name=str(i),
+                   email=f"guest{i}@example.com", hashed_password="x")
+              for i in range(GUESTS)]
+    amenities = [Amenity(id=str(uuid4()), name=f"Amenity {i}",
+                         description="Test") for i in range(5)]
+    db.session.add_all(guests + amenities)
+    db.session.commit()
+    amenity_ids = [amenity.id for amenity in amenities]
+
+    place_ids = facade.create_places([{
+        "title": f"Maison {i}",
+        "description": "Une maison de test pour les budgets",
+        "price": 20.0 + i % 100,
+        "latitude": 43.6 + (i % 30) / 1000,
+        "longitude": 1.44 + (i // 30) / 1000,
+        "owner_id": owner_id,
+        "amenity_ids": amenity_ids[:i % 4]
+    } for i in range(PLACES)])
+
+    rows = []
+    for i in range(PENDING_BOOKINGS):
+        start = now + timedelta(days=10 + i % 20)
+        rows.append(Booking(id=str(uuid4()), status="PENDING",
+                            place=place_ids[i], user=guests[i % GUESTS].id,
+                            start_date=start,
+                            end_date=start + timedelta(days=3)))
+    for i in range(REVIEWS):
+        start = now - timedelta(days=30 + i)
+        booking = Booking(id=str(uuid4()), status="DONE",
+                          place=place_ids[0], user=guests[i % GUESTS].id,
+                          start_date=start,
+                          end_date=start + timedelta(days=2))
+        rows.append(booking)
+        rows.append(Review(id=str(uuid4()), comment="Très bien",
+                           rating=1 + i % 5, place=place_ids[0],
+                           user_ide=guests[i % GUESTS].id,
+                           user_first_name="Guest", user_last_name=str(i),
+                           booking=booking.id))
+    db.session.add_all(rows)
+    db.session.commit()
+    facade.rebuild_availability()
+
+
+def login(email):
+    client = app.test_client()
+    res = client.post("/api/v1/users/login", json={"email": email,
+                                                   "password": "123456"})
+    assert res.status_code == 200, res.get_data(as_text=True)
+    return client
+
+
+admin = login("admin@example.com")
+owner = login("owner@example.com")
+anonymous = app.test_client()
+
+stay = {
+    "start_date": (now + timedelta(days=12)).date().isoformat(),
+    "end_date": (now + timedelta(days=15)).date().isoformat()
+}
+checks = [
+    (admin, "/api/v1/users/", {}),
+    (admin, "/api/v1/users/", {"limit": 20}),
+    (admin, "/api/v1/users/", {"email": "owner@example.com"}),
+    (anonymous, "/api/v1/places/", {}),
+    (anonymous, "/api/v1/places/", {"limit": 100}),
+    (anonymous, "/api/v1/places/", {"amenity_ids": ",".join(amenity_ids[:2]),
+                                    "min_price": 30}),
+    (anonymous, "/api/v1/places/available", stay),
+    (anonymous, "/api/v1/places/nearby", {"lat": 43.61, "lon": 1.445,
+                                          "radius_km": 5, "limit": 100}),
+    (anonymous, "/api/v1/places/search", {"q": "maison"}),
+    (anonymous, f"/api/v1/places/{place_ids[0]}", {}),
+    (anonymous, f"/api/v1/places/{place_ids[0]}/availability", {}),
+    (anonymous, f"/api/v1/reviews/places/{place_ids[0]}/reviews", {}),
+    (anonymous, f"/api/v1/reviews/places/{place_ids[0]}/reviews",
+     {"limit": 10}),
+    (owner, "/api/v1/bookings/owner/pending", {}),
+]
+
+for client, path, params in checks:
+    res = client.get(path, query_string=params)
+    count = res.headers.get("X-Query-Count")
+    budget = res.headers.get("X-Query-Budget")
+    print(f"{path} {params} => {res.status_code}, "
+          f"{count} statements for a budget of {budget}")
+    assert res.status_code == 200, res.get_data(as_text=True)
+    assert budget is not None, "Expected the endpoint to declare a budget"
+    assert int(count) <= int(budget), "Query budget exceeded"
+
+n_plus_one = [message for message in warnings.messages
+              if "N+1" in message or "budget" in message]
+assert not n_plus_one, n_plus_one
+
+print("✅ Query budgets tests passed")
@@ -0,0 +1,86 @@
+"""
+This module provides a testing suite for the places listings and
+searches.
+"""
+
+
+from datetime import datetime, timedelta, timezone
+import requests
+
+BASE_URL = "http://localhost:5001/api/v1"
+DEFAULT_PAGE_SIZE = 20
+
+print("========== Running the search tests ==========")
+
+
+requests.post(f"{BASE_URL}/users", json={
+    "email": "search@example.com",
+    "password": "123456",
+    "first_name": "User",
+    "last_name": "Test"
+})
+session = requests.Session()
+res = session.post(f"{BASE_URL}/users/login", json={
+    "email": "search@example.com",
+    "password": "123456"
+})
+print("Login =>", res.status_code)
+
+res = session.post(f"{BASE_URL}/places/", json={
+    "title": "Maison de test des recherches",
+    "description": "Une maison libre",
+    "price": 80.0,
+    "latitude": 43.6045,
+    "longitude": 1.4442
+})
+print("Status:", res.status_code)
+assert res.status_code == 201, res.text
+
+# A date without timezone is read as UTC, whatever the other one is
+start = datetime.now(timezone.utc).date() + timedelta(days=60)
+end = start + timedelta(days=4)
+res = requests.get(f"{BASE_URL}/places/available", params={
+    "start_date": start.isoformat(),
+    "end_date": f"{end.isoformat()}T00:00:00Z"
+})
+print("Status:", res.status_code)
+assert res.status_code == 200, res.text
+
+res = requests.get(f"{BASE_URL}/places/available", params={
+    "start_date": f"{end.isoformat()}T00:00:00+00:00",
+    "end_date": end.isoformat()
+})
+print("Status:", res.status_code)
+assert res.status_code == 400, res.text
+
+# More places than one default page
+for i in range(DEFAULT_PAGE_SIZE):
+    res = session.post(f"{BASE_URL}/places/", json={
+        "title": f"Maison de test des pages {i}",
+        "description": "Une maison parmi d'autres",
+        "price": 50.0 + i,
+        "latitude": 43.6 + i / 1000,
+        "longitude": 1.44
+    })
+    assert res.status_code == 201, res.text
+
+# The listing is paginated even without a limit
+res = requests.get(f"{BASE_URL}/places/")
+print("Status:", res.status_code, len(res.json()))
+assert res.status_code == 200, res.text
+assert len(res.json()) == DEFAULT_PAGE_SIZE, "Expected one default page"
+cursor = res.headers.get("X-Next-Cursor")
+assert cursor, "Expected the cursor of the next page"
+
+seen = {place["id"] for place in res.json()}
+while cursor:
+    res = requests.get(f"{BASE_URL}/places/", params={"cursor": cursor,
+                                                      "limit": 100})
+    assert res.status_code == 200, res.text
+    page = {place["id"] for place in res.json()}
+    assert not page & seen, "Expected no place on two pages"
+    seen |= page
+    cursor = res.headers.get("X-Next-Cursor")
+print("Places listed:", len(seen))
+
+print("✅ Search tests passed")
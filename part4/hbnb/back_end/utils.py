@@ -1,5 +1,6 @@
 from app.models.amenity import Amenity
-from sqlalchemy import delete
+from sqlalchemy import delete, inspect, select, text
+from sqlalchemy.exc import DatabaseError, IntegrityError, OperationalError
 from app.models.user import RevokedToken
 from datetime import datetime, timezone
 from extensions import db
@@ -15,13 +16,287 @@ def delete_invalid_amenities():
     print(f"{result.rowcount} amenities invalides supprimées")
 
 
-def purge_expired_tokens():
+# The queries run on every booking, review and login flow, with the
+# parameters used to ask SQLite for their query plan.
+HOT_QUERIES = {
+    'pending bookings of a place':
+        "SELECT id FROM bookings WHERE place = :place "
+        "AND status = 'PENDING'",
+    'overlapping bookings':
+        "SELECT id FROM bookings WHERE place = :place "
+        "AND status = 'PENDING' AND start_date < :date AND end_date > :date",
+    'places free for a stay':
+        "SELECT id FROM place WHERE NOT EXISTS (SELECT 1 FROM bookings "
+        "WHERE bookings.place = place.id AND status = 'PENDING' "
+        "AND start_date < :date AND end_date > :date) "
+        "ORDER BY created_at, id",
+    'pending bookings of an owner':
+        "SELECT id FROM bookings WHERE place IN "
+        "(SELECT id FROM place WHERE owner_id = :user) "
+        "AND status = 'PENDING'",
+    'bookings of a user':
+        "SELECT id FROM bookings WHERE \"user\" = :user",
+    'finished pending bookings':
+        "SELECT id FROM bookings WHERE status = 'PENDING' "
+        "AND end_date < :date",
+    'reviews of a place':
+        "SELECT id FROM reviews WHERE place = :place "
+        "ORDER BY created_at, id",
+    'review of a booking':
+        "SELECT id FROM reviews WHERE booking = :booking",
+    'expired revoked tokens':
+        "SELECT jti FROM revoked_tokens WHERE expires_at < :date",
+    'amenity by name':
+        "SELECT id FROM amenity WHERE name = :name",
+    'places with pending photos':
+        "SELECT id FROM place WHERE photos_status = 'pending'",
+}
+
+
+# Indexes superseded by a newer one, dropped once the new one exists
+REPLACED_INDEXES = {
+    'uq_reviews_booking': 'ix_reviews_booking',
+}
+
+
+def ensure_columns():
+    """
+    Add the columns declared on the models that are missing from the
+    tables of an existing database. Such columns must be nullable or
+    have a server default. Returns the list of (table, column) added.
+    """
+    inspector = inspect(db.engine)
+    added = []
+    for table in db.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {column['name'] for column in
+                    inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            ddl = (f'ALTER TABLE "{table.name}" ADD COLUMN "{column.name}" '
+                   f'{column.type.compile(db.engine.dialect)}')
+            if column.server_default is not None:
+                ddl += f" DEFAULT '{column.server_default.arg}'"
+            if not column.nullable:
+                ddl += ' NOT NULL'
+            db.session.execute(text(ddl))
+            added.append((table.name, column.name))
+    db.session.commit()
+    if added:
+        print(f"{len(added)} columns added: "
+              f"{', '.join('.'.join(column) for column in added)}")
+    return added
+
+
+def backfill_place_ratings():
+    """
+    Compute the rating sum and count of every place from its reviews.
+    Only needed once, when the columns are added to an existing database.
+    """
+    db.session.execute(text(
+        "UPDATE place SET "
+        "rating_sum = COALESCE((SELECT SUM(rating) FROM reviews "
+        "WHERE reviews.place = place.id), 0), "
+        "review_count = (SELECT COUNT(*) FROM reviews "
+        "WHERE reviews.place = place.id)"
+    ))
+    db.session.commit()
+
+
+def ensure_indexes():
+    """
+    Create the indexes declared on the models that are missing from the
+    database. create_all() only creates them with new tables, so this
+    applies them to databases created by an older version.
+    """
+    inspector = inspect(db.engine)
+    created = []
+    for table in db.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {index['name'] for index in
+                    inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name in existing:
+                continue
+            try:
+                index.create(db.engine)
+            except IntegrityError:
+                print(f"Index {index.name} not created: {table.name} "
+                      "holds duplicate values")
+                continue
+            created.append(index.name)
+            replaced = REPLACED_INDEXES.get(index.name)
+            if replaced in existing:
+                db.session.execute(text(f'DROP INDEX "{replaced}"'))
+                db.session.commit()
+    if created:
+        print(f"{len(created)} indexes created: {', '.join(created)}")
+    return created
+
+
+# R*Tree index over the place coordinates, keyed by the place rowid and
+# kept in sync by triggers so every write path (ORM, bulk, raw SQL)
+# updates it. The place key is TEXT, so a VACUUM may renumber the rowids
+# behind the triggers' back: the index is checked against the table at
+# startup and rebuilt when they disagree.
+SPATIAL_INDEX_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS place_rtree "
+    "USING rtree(id, min_lat, max_lat, min_lon, max_lon)",
+    "CREATE TRIGGER IF NOT EXISTS place_rtree_insert AFTER INSERT ON place "
+    "BEGIN INSERT INTO place_rtree VALUES (NEW.rowid, NEW.latitude, "
+    "NEW.latitude, NEW.longitude, NEW.longitude); END",
+    "CREATE TRIGGER IF NOT EXISTS place_rtree_update "
+    "AFTER UPDATE OF latitude, longitude ON place "
+    "BEGIN UPDATE place_rtree SET min_lat = NEW.latitude, "
+    "max_lat = NEW.latitude, min_lon = NEW.longitude, "
+    "max_lon = NEW.longitude WHERE id = NEW.rowid; END",
+    "CREATE TRIGGER IF NOT EXISTS place_rtree_delete AFTER DELETE ON place "
+    "BEGIN DELETE FROM place_rtree WHERE id = OLD.rowid; END",
+]
+
+
+def spatial_index_in_sync():
+    """
+    Tell if the R*Tree index holds exactly one box per place, under the
+    current rowid of the place and around its coordinates.
     """
+    places, boxes, matching = db.session.execute(text(
+        "SELECT (SELECT count(*) FROM place), "
+        "(SELECT count(*) FROM place_rtree), "
+        "(SELECT count(*) FROM place_rtree r JOIN place p ON p.rowid = r.id "
+        "WHERE p.latitude BETWEEN r.min_lat AND r.max_lat "
+        "AND p.longitude BETWEEN r.min_lon AND r.max_lon)"
+    )).one()
+    return places == boxes == matching
+
+
+def ensure_spatial_index(rebuild=False):
+    """
+    Create the R*Tree index of the place coordinates, and refill it when
+    it no longer matches the places or when rebuild is set. Returns False
+    when the database is not SQLite, in which case the (latitude,
+    longitude) index is used.
     """
-    now = datetime.now(timezone.utc)
-    expired = RevokedToken.query.filter(RevokedToken.expires_at < now).all()
+    if db.engine.dialect.name != 'sqlite':
+        return False
+    for statement in SPATIAL_INDEX_DDL:
+        db.session.execute(text(statement))
+    if rebuild or not spatial_index_in_sync():
+        db.session.execute(text("DELETE FROM place_rtree"))
+        db.session.execute(text(
+            "INSERT INTO place_rtree SELECT rowid, latitude, latitude, "
+            "longitude, longitude FROM place"
+        ))
+        print("Spatial index of the places rebuilt")
+    db.session.commit()
+    return True
+
+
+# FTS5 index over the place title and description. It reads the text
+# from the place table (external content) and is kept in sync by
+# triggers. Titles weigh ten times more than descriptions in the rank.
+# Like the R*Tree, it is keyed by the place rowid, so it is checked
+# against the table at startup and rebuilt when they disagree.
+SEARCH_INDEX_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS place_fts USING fts5("
+    "title, description, content='place', content_rowid='rowid', "
+    "tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER IF NOT EXISTS place_fts_insert AFTER INSERT ON place "
+    "BEGIN INSERT INTO place_fts(rowid, title, description) "
+    "VALUES (NEW.rowid, NEW.title, NEW.description); END",
+    "CREATE TRIGGER IF NOT EXISTS place_fts_update "
+    "AFTER UPDATE OF title, description ON place "
+    "BEGIN INSERT INTO place_fts(place_fts, rowid, title, description) "
+    "VALUES ('delete', OLD.rowid, OLD.title, OLD.description); "
+    "INSERT INTO place_fts(rowid, title, description) "
+    "VALUES (NEW.rowid, NEW.title, NEW.description); END",
+    "CREATE TRIGGER IF NOT EXISTS place_fts_delete AFTER DELETE ON place "
+    "BEGIN INSERT INTO place_fts(place_fts, rowid, title, description) "
+    "VALUES ('delete', OLD.rowid, OLD.title, OLD.description); END",
+]
 
-    for token in expired:
-        db.session.delete(token)
 
+def search_index_in_sync():
+    """
+    Tell if the full-text index matches the title and description of
+    the places under their current rowid, with the FTS5 integrity check.
+    """
+    try:
+        db.session.execute(text(
+            "INSERT INTO place_fts(place_fts, rank) "
+            "VALUES ('integrity-check', 1)"))
+    except DatabaseError:
+        db.session.rollback()
+        return False
+    return True
+
+
+def ensure_search_index(rebuild=False):
+    """
+    Create the full-text index of the places, and index the places again
+    the first time, when it no longer matches them or when rebuild is
+    set. Returns False when the database is not SQLite or lacks FTS5.
+    """
+    if db.engine.dialect.name != 'sqlite':
+        return False
+    exists = db.session.execute(text(
+        "SELECT 1 FROM sqlite_master WHERE name = 'place_fts'")).first()
+    try:
+        for statement in SEARCH_INDEX_DDL:
+            db.session.execute(text(statement))
+    except OperationalError:
+        db.session.rollback()
+        return False
+    db.session.commit()
+    if rebuild or not exists or not search_index_in_sync():
+        db.session.execute(text(
+            "INSERT INTO place_fts(place_fts) VALUES ('rebuild')"))
+        db.session.execute(text(
+            "INSERT INTO place_fts(place_fts, rank) "
+            "VALUES ('rank', 'bm25(10.0, 1.0)')"))
+        if exists:
+            print("Full-text index of the places rebuilt")
     db.session.commit()
+    return True
+
+
+def explain_hot_queries():
+    """
+    Return the SQLite query plan of each hot query and whether it is
+    served by an index rather than a full table scan.
+    """
+    params = {'place': '', 'user': '', 'booking': '', 'name': '',
+              'date': datetime.now(timezone.utc)}
+    report = {}
+    for name, query in HOT_QUERIES.items():
+        rows = db.session.execute(
+            text('EXPLAIN QUERY PLAN ' + query), params).all()
+        details = [row[-1] for row in rows]
+        full_scan = any(detail.startswith('SCAN') and 'USING' not in detail
+                        for detail in details)
+        report[name] = {'plan': details, 'uses_index': not full_scan}
+    return report
+
+
+def purge_expired_tokens(batch_size=1000):
+    """
+    Delete the expired revoked tokens with set-based DELETE statements
+    of at most batch_size rows, each in its own short transaction.
+    Returns the number of deleted tokens.
+    """
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    expired = (select(RevokedToken.jti)
+               .where(RevokedToken.expires_at < now)
+               .limit(batch_size))
+    purged = 0
+    while True:
+        result = db.session.execute(
+            delete(RevokedToken).where(RevokedToken.jti.in_(expired))
+        )
+        db.session.commit()
+        purged += result.rowcount
+        if result.rowcount < batch_size:
+            return purged
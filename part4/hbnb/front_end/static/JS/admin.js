@@ -131,10 +131,22 @@ document.addEventListener('DOMContentLoaded', async () => {
     });
 });
 
+// Fetch a whole list: the listings are paginated, so the pages are
+// requested one after another with the X-Next-Cursor of the previous one
 async function fetchData(endpoint) {
-    const res = await fetchWithAutoRefresh(endpoint);
-    if (!res.ok) throw new Error(`Failed to fetch ${endpoint}`);
-    return await res.json();
+    const items = [];
+    let cursor = null;
+    do {
+        const query = cursor ? `&cursor=${encodeURIComponent(cursor)}` : '';
+        const res = await fetchWithAutoRefresh(`${endpoint}/?limit=100${query}`);
+        if (res.status === 404) break;
+        if (!res.ok) throw new Error(`Failed to fetch ${endpoint}`);
+        const page = await res.json();
+        if (!Array.isArray(page)) break;
+        items.push(...page);
+        cursor = res.headers.get('X-Next-Cursor');
+    } while (cursor);
+    return items;
 }
 
 function renderUsers(users) {
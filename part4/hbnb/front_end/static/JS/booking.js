@@ -1,36 +1,20 @@
 document.addEventListener('DOMContentLoaded', async () => {
     const placeId = document.body.getAttribute("data-place-id");
 
-    const toDayOnly = (d) => {
-        const date = new Date(d);
-        date.setUTCHours(0, 0, 0, 0);
-        return date;
-    };
-
     let disabeldRanges = [];
     try {
-        const res = await fetch(`/api/v1/bookings/places/${placeId}/pending_booking`, {
-            headers: {
-                'Authorization': `Bearer ${localStorage.getItem('access_token')}`
-            }
-        });
+        const from = new Date().toISOString().slice(0, 10);
+        const to = new Date(Date.now() + 365 * 86400000).toISOString().slice(0, 10);
+        const res = await fetch(`/api/v1/places/${placeId}/availability?from=${from}&to=${to}`);
 
         if (res.ok) {
-            const bookings = await res.json();
-            
-            if (!Array.isArray(bookings)) {
-                disabeldRanges = [];
-            } else {
-                disabeldRanges = bookings.map(b => ({
-                    from: toDayOnly(b.start_date),
-                    to: toDayOnly(b.end_date)
-                }));
-            }
+            const calendar = await res.json();
+            disabeldRanges = calendar.booked_days || [];
         } else {
-            console.warn('Can\'t fetch existing bookings');
+            console.warn('Can\'t fetch the availability of the place');
         }
     } catch (err) {
-        console.error('Error fetching bookings:', err);
+        console.error('Error fetching availability:', err);
     }
 
     // FLATPICKR setup
@@ -27,56 +27,73 @@ document.addEventListener('DOMContentLoaded', async () => {
     score.textContent = rating.toFixed(1);
     container.appendChild(score);
 
-    // REVIEWS
+    // REVIEWS, one page at a time
     const reviewsSection = document.getElementById('reviews-section');
     const reviewsList = document.getElementById('reviews-list');
     const placeId = reviewsSection?.getAttribute('data-place-id');
+    let reviewsCursor = null;
 
-    if (placeId) {
-        try {
-            const res = await fetchWithAutoRefresh(`/reviews/places/${placeId}/reviews`);
-            if (res.ok) {
-                const reviews = await res.json();
-
-                if (reviews.length > 0) {
-                    reviewsList.innerHTML = reviews.map(review => `
-                        <li>
-                            <strong>${review.user_first_name} ${review.user_last_name}</strong><br/>
-                            <p>${review.comment}</p>
-                            <span class="rating" data-rating="${review.rating}"></span>
-                        </li>
-                    `).join('');
-                    document.querySelectorAll('.rating:not(.interactive-rating)').forEach(container => {
-                        const rating = parseFloat(container.dataset.rating) || 0;
-                        const fullStars = Math.floor(rating);
-                        const hasHalfStar = rating - fullStars >= 0.5;
-                        container.innerHTML = '';
-                    
-                        for (let i = 0; i < 5; i++) {
-                            const star = document.createElement('span');
-                            star.classList.add('star');
-                            if (i < fullStars) {
-                                star.classList.add('filled');
-                                star.textContent = '★';
-                            } else if (i === fullStars && hasHalfStar) {
-                                star.classList.add('half');
-                                star.textContent = '★';
-                            } else {
-                                star.textContent = '☆';
-                            }
-                            container.appendChild(star);
-                        }
-                    });
+    const moreReviewsButton = document.createElement('button');
+    moreReviewsButton.classList.add('cool-button');
+    moreReviewsButton.textContent = 'More reviews';
+    moreReviewsButton.style.display = 'none';
+    reviewsList?.after(moreReviewsButton);
+
+    async function loadReviews() {
+        const query = reviewsCursor ? `?cursor=${encodeURIComponent(reviewsCursor)}` : '';
+        const res = await fetchWithAutoRefresh(`/reviews/places/${placeId}/reviews${query}`);
+        if (!res.ok) throw new Error(`HTTP error ${res.status}`);
+
+        const reviews = await res.json();
+        reviewsCursor = res.headers.get('X-Next-Cursor');
+        moreReviewsButton.style.display = reviewsCursor ? '' : 'none';
+
+        if (!Array.isArray(reviews) || reviews.length === 0) {
+            if (!reviewsList.children.length) {
+                reviewsList.innerHTML = '<li>No reviews found for this place</li>';
+            }
+            return;
+        }
+
+        reviewsList.insertAdjacentHTML('beforeend', reviews.map(review => `
+            <li>
+                <strong>${review.user_first_name} ${review.user_last_name}</strong><br/>
+                <p>${review.comment}</p>
+                <span class="rating" data-rating="${review.rating}"></span>
+            </li>
+        `).join(''));
+        reviewsList.querySelectorAll('.rating:empty').forEach(container => {
+            const rating = parseFloat(container.dataset.rating) || 0;
+            const fullStars = Math.floor(rating);
+            const hasHalfStar = rating - fullStars >= 0.5;
+
+            for (let i = 0; i < 5; i++) {
+                const star = document.createElement('span');
+                star.classList.add('star');
+                if (i < fullStars) {
+                    star.classList.add('filled');
+                    star.textContent = '★';
+                } else if (i === fullStars && hasHalfStar) {
+                    star.classList.add('half');
+                    star.textContent = '★';
                 } else {
-                    reviewsList.innerHTML = '<li>No reviews found for this place</li>';
+                    star.textContent = '☆';
                 }
-            } else {
-                reviewsList.innerHTML = '<li>Error loading reviews</li>';
+                container.appendChild(star);
             }
+        });
+    }
+
+    if (placeId) {
+        try {
+            await loadReviews();
         } catch (err) {
             console.error('Failed to load reviews:', err);
             reviewsList.innerHTML = '<li>Error loading reviews</li>';
         }
+        moreReviewsButton.addEventListener('click', () => {
+            loadReviews().catch(err => console.error('Failed to load reviews:', err));
+        });
     } else {
         reviewsList.innerHTML = '<li>No place specified for reviews</li>';
     }
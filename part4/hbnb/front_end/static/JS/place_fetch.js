@@ -13,6 +13,21 @@ document.addEventListener('DOMContentLoaded', () => {
     let expandedCard = null;
     let lastScrollTop = 0;
 
+    // The places are fetched one page at a time, filtered by the API
+    const PAGE_SIZE = 20;
+    let searchParams = new URLSearchParams({ limit: PAGE_SIZE });
+    let searchCenter = null;
+    let searchId = 0;
+    let nextCursor = null;
+
+    // Button loading the next page of the current search
+    const moreButton = document.createElement('button');
+    moreButton.id = 'more-places';
+    moreButton.classList.add('cool-button');
+    moreButton.textContent = 'More places';
+    moreButton.style.display = 'none';
+    placesList.after(moreButton);
+
     // Create a container for address suggestions
     const choicesContainer = document.createElement("div");
     choicesContainer.id = "choices-container";
@@ -31,70 +46,104 @@ document.addEventListener('DOMContentLoaded', () => {
         return distance;
     }
 
-    // Function to apply filters
-    function applyFilters(lat = null, lon = null) {
-        const placeCards = document.querySelectorAll('.place-card');
-        const address = addressInput.value.trim().toLowerCase() || undefined;
-        const minPrice = minPriceInput.value.trim() ? parseFloat(minPriceInput.value) : undefined;
-        const maxPrice = maxPriceInput.value.trim() ? parseFloat(maxPriceInput.value) : undefined;
-        const maxDistance = distanceInput.value.trim() ? parseFloat(distanceInput.value) : undefined;
-        let visibleCount = 0;
-
-        placeCards.forEach(card => {
-            const price = parseFloat(card.dataset.price);
-            const placeLocation = card.dataset.location?.toLowerCase() || '';
-            const latPlace = parseFloat(card.dataset.lat);
-            const lonPlace = parseFloat(card.dataset.lon);
+    // Bounding box 'south,west,north,east' around a circle, for the bbox filter
+    function boundingBox(lat, lon, radiusKm) {
+        const dLat = radiusKm / 111.32;
+        const dLon = radiusKm / (111.32 * Math.max(Math.cos(lat * Math.PI / 180), 0.01));
+        const south = Math.max(lat - dLat, -90);
+        const north = Math.min(lat + dLat, 90);
+        let west = lon - dLon;
+        let east = lon + dLon;
+        if (dLon >= 180) {
+            west = -180;
+            east = 180;
+        } else {
+            if (west < -180) west += 360;
+            if (east > 180) east -= 360;
+        }
+        return [south, west, north, east].map(value => value.toFixed(6)).join(',');
+    }
 
-            let priceOk = true;
-            if (minPrice !== undefined && (isNaN(price) || price < minPrice)) {
-                priceOk = false;
-            }
-            if (maxPrice !== undefined && (isNaN(price) || price > maxPrice)) {
-                priceOk = false;
-            }
+    // Query string of a search: the filters are applied by the API
+    function buildSearch(lat = null, lon = null) {
+        const params = new URLSearchParams({ limit: PAGE_SIZE });
+        if (minPriceInput.value.trim()) params.set('min_price', minPriceInput.value.trim());
+        if (maxPriceInput.value.trim()) params.set('max_price', maxPriceInput.value.trim());
 
-            let distanceOk = true;
-            if (maxDistance !== undefined && lat !== null && lon !== null && !isNaN(latPlace) && !isNaN(lonPlace)) {
-                if (latPlace < -90 || latPlace > 90 || lonPlace < -180 || lonPlace > 180) {
-                    distanceOk = false;
-                } else {
-                    const dist = haversineDistance(lat, lon, latPlace, lonPlace);
-                    distanceOk = dist <= maxDistance;
-                    if (!distanceOk) {
-                    }
-                }
-            }
-
-            let locationOk = true;
-            if (address !== undefined && lat === null && lon === null) {
-                const searchCity = address.split(',')[0].trim().toLowerCase();
-                locationOk = placeLocation.includes(searchCity);
-                if (!locationOk) {
-                }
-            }
+        const maxDistance = distanceInput.value.trim() ? parseFloat(distanceInput.value) : undefined;
+        searchCenter = null;
+        if (maxDistance !== undefined && lat !== null && lon !== null) {
+            params.set('bbox', boundingBox(lat, lon, maxDistance));
+            searchCenter = { lat, lon, maxDistance };
+        }
+        return params;
+    }
 
-            if (priceOk && distanceOk && locationOk) {
-                card.style.display = '';
-                visibleCount++;
-            } else {
-                card.style.display = 'none';
-            }
-        });
+    function showNoResults(message) {
+        placesList.querySelector('#no-results-msg')?.remove();
+        if (placesList.querySelector('.place-card')) return;
 
         const noResultMessage = document.createElement('p');
         noResultMessage.id = 'no-results-msg';
-        noResultMessage.textContent = 'No results found for these criteria.';
-        noResultMessage.style.display = visibleCount === 0 ? 'block' : 'none';
+        noResultMessage.textContent = message || 'No results found for these criteria.';
+        placesList.appendChild(noResultMessage);
+    }
 
-        if (placesList.querySelector('#no-results-msg')) {
-            placesList.removeChild(placesList.querySelector('#no-results-msg'));
+    // Start a new search, showing its first page
+    async function loadPlaces(lat = null, lon = null) {
+        searchParams = buildSearch(lat, lon);
+        searchId++;
+        nextCursor = null;
+        placesList.innerHTML = '';
+        try {
+            await loadNextPage();
+        } catch (err) {
+            placesList.innerHTML = '<p>An error occurred, can\'t display places.</p>';
+            console.error(err);
         }
-        if (visibleCount === 0) {
-            placesList.appendChild(noResultMessage);
+    }
+
+    // Fetch the next page of the current search and append its places
+    async function loadNextPage() {
+        const currentSearch = searchId;
+        const params = new URLSearchParams(searchParams);
+        if (nextCursor) params.set('cursor', nextCursor);
+        const response = await fetchWithAutoRefresh(`/places/?${params}`);
+        // A newer search was started meanwhile
+        if (currentSearch !== searchId) return;
+
+        let places = [];
+        nextCursor = null;
+        if (response.status === 400) {
+            moreButton.style.display = 'none';
+            showNoResults('Invalid search criteria, please check the prices.');
+            return;
+        }
+        if (response.status !== 404) {
+            if (!response.ok) throw new Error('Error while fetching places');
+            places = await response.json();
+            if (currentSearch !== searchId) return;
+            nextCursor = response.headers.get('X-Next-Cursor');
+        }
+
+        // The bounding box is a square: keep the places inside the circle
+        if (searchCenter) {
+            places = places.filter(place => haversineDistance(
+                searchCenter.lat, searchCenter.lon, place.latitude, place.longitude
+            ) <= searchCenter.maxDistance);
         }
+
+        const placeCards = places.map(createPlaceCard);
+        placeCards.forEach(card => placesList.appendChild(card));
+        moreButton.style.display = nextCursor ? '' : 'none';
+        showNoResults();
+        fetchAndDisplayCities(placeCards);
     }
 
+    moreButton.addEventListener('click', () => {
+        loadNextPage().catch(err => console.error(err));
+    });
+
     // Function to handle filtering with geocoding
     function setupSearch() {
         form.addEventListener('submit', async (e) => {
@@ -140,7 +189,7 @@ document.addEventListener('DOMContentLoaded', () => {
                             item.addEventListener("click", () => {
                                 addressInput.value = item.textContent;
                                 choicesContainer.innerHTML = "";
-                                applyFilters(parseFloat(item.dataset.lat), parseFloat(item.dataset.lon));
+                                loadPlaces(parseFloat(item.dataset.lat), parseFloat(item.dataset.lon));
                             });
                         });
                         choicesContainer.querySelector('.close-choices')?.addEventListener('click', () => {
@@ -152,7 +201,7 @@ document.addEventListener('DOMContentLoaded', () => {
                         document.querySelectorAll('.place-card').forEach(card => card.style.display = 'none');
                     } else if (!data.error) {
                         choicesContainer.innerHTML = "";
-                        applyFilters(parseFloat(data.lat), parseFloat(data.lon));
+                        loadPlaces(parseFloat(data.lat), parseFloat(data.lon));
                     } else {
                         choicesContainer.innerHTML = "";
                         placesList.innerHTML = '<p>City not found. Please try again.</p>';
@@ -165,158 +214,142 @@ document.addEventListener('DOMContentLoaded', () => {
                 }
             } else {
                 choicesContainer.innerHTML = "";
-                applyFilters();
+                loadPlaces();
             }
         });
     }
 
-    // Load places from API
-    fetchWithAutoRefresh('/places')
-        .then(response => {
-            if (!response.ok) throw new Error('Error while fetching places');
-            return response.json();
-        })
-        .then(data => {
-            placesList.innerHTML = '';
-
-            data.forEach(place => {
-                const placeCard = document.createElement('article');
-                placeCard.classList.add('place-card');
-                placeCard.dataset.lat = place.latitude;
-                placeCard.dataset.lon = place.longitude;
-                placeCard.dataset.price = place.price;
-                placeCard.dataset.location = '';
-
-                const rating = place.rating !== null ? place.rating : 0;
-                const maxRating = 5;
-                const fullStars = Math.floor(rating);
-                const hasHalfStar = rating % 1 >= 0.5;
-                let ratingHTML = '<div class="rating">';
-                for (let i = 1; i <= maxRating; i++) {
-                    if (i <= fullStars) {
-                        ratingHTML += '<i class="fa fa-star star filled"></i>';
-                    } else if (i === fullStars + 1 && hasHalfStar) {
-                        ratingHTML += '<i class="fa fa-star-half-alt star filled"></i>';
-                    } else {
-                        ratingHTML += '<i class="fa fa-star star"></i>';
-                    }
+    function createPlaceCard(place) {
+        const placeCard = document.createElement('article');
+        placeCard.classList.add('place-card');
+        placeCard.dataset.lat = place.latitude;
+        placeCard.dataset.lon = place.longitude;
+        placeCard.dataset.price = place.price;
+        placeCard.dataset.location = '';
+
+        const rating = place.rating !== null ? place.rating : 0;
+        const maxRating = 5;
+        const fullStars = Math.floor(rating);
+        const hasHalfStar = rating % 1 >= 0.5;
+        let ratingHTML = '<div class="rating">';
+        for (let i = 1; i <= maxRating; i++) {
+            if (i <= fullStars) {
+                ratingHTML += '<i class="fa fa-star star filled"></i>';
+            } else if (i === fullStars + 1 && hasHalfStar) {
+                ratingHTML += '<i class="fa fa-star-half-alt star filled"></i>';
+            } else {
+                ratingHTML += '<i class="fa fa-star star"></i>';
+            }
+        }
+        ratingHTML += `<span class="score">${
+            place.rating !== null ? place.rating + '/5' : 'No reviews yet'
+        }</span></div>`;
+
+        const cityParagraph = document.createElement('p');
+        cityParagraph.classList.add('place-city');
+        cityParagraph.innerHTML = 'City: <span class="city-placeholder">Loading</span>';
+
+        let imageUrl = '/static/images/default-placeholder.png';
+        if (typeof place.photos_url === 'string') {
+            try {
+                const parsedPhotos = JSON.parse(place.photos_url);
+                if (Array.isArray(parsedPhotos) && parsedPhotos.length > 0) {
+                    imageUrl = parsedPhotos[0];
+                } else if (place.photos_url) {
+                    imageUrl = place.photos_url;
                 }
-                ratingHTML += `<span class="score">${
-                    place.rating !== null ? place.rating + '/5' : 'No reviews yet'
-                }</span></div>`;
-
-                const cityParagraph = document.createElement('p');
-                cityParagraph.classList.add('place-city');
-                cityParagraph.innerHTML = 'City: <span class="city-placeholder">Loading</span>';
-
-                let imageUrl = '/static/images/default-placeholder.png';
-                if (typeof place.photos_url === 'string') {
-                    try {
-                        const parsedPhotos = JSON.parse(place.photos_url);
-                        if (Array.isArray(parsedPhotos) && parsedPhotos.length > 0) {
-                            imageUrl = parsedPhotos[0];
-                        } else if (place.photos_url) {
-                            imageUrl = place.photos_url;
-                        }
-                    } catch (e) {
-                        if (place.photos_url) {
-                            imageUrl = place.photos_url;
-                        }
-                    }
-                } else if (Array.isArray(place.photos_url) && place.photos_url.length > 0) {
-                    imageUrl = place.photos_url[0];
+            } catch (e) {
+                if (place.photos_url) {
+                    imageUrl = place.photos_url;
                 }
+            }
+        } else if (Array.isArray(place.photos_url) && place.photos_url.length > 0) {
+            imageUrl = place.photos_url[0];
+        }
 
-                placeCard.innerHTML = `
-                    <img src="${imageUrl}" alt="Image of ${place.title}" class="place-image" />
-                    <div class="place-summary">
-                        <h3>${place.title}</h3>
-                        <p class="price">${place.price}€ per night</p>
-                    </div>
-                    <div class="place-details">
-                        ${ratingHTML}
-                        <p class="description">${place.description}</p>
-                    </div>
-                    <button class="details-button" data-id="${place.id || ''}">More details</button>
-                `;
-
-                placeCard.querySelector('.place-summary').appendChild(cityParagraph);
-
-                const detailButton = placeCard.querySelector('.details-button');
-                detailButton.addEventListener('click', (e) => {
-                    e.stopPropagation();
-                    e.preventDefault();
-                    const placeId = e.target.getAttribute('data-id');
-                    if (placeId) {
-                        window.location.href = `http://127.0.0.1:5001/places/${placeId}`;
-                    }
-                });
+        placeCard.innerHTML = `
+            <img src="${imageUrl}" alt="Image of ${place.title}" class="place-image" />
+            <div class="place-summary">
+                <h3>${place.title}</h3>
+                <p class="price">${place.price}€ per night</p>
+            </div>
+            <div class="place-details">
+                ${ratingHTML}
+                <p class="description">${place.description}</p>
+            </div>
+            <button class="details-button" data-id="${place.id || ''}">More details</button>
+        `;
+
+        placeCard.querySelector('.place-summary').appendChild(cityParagraph);
+
+        const detailButton = placeCard.querySelector('.details-button');
+        detailButton.addEventListener('click', (e) => {
+            e.stopPropagation();
+            e.preventDefault();
+            const placeId = e.target.getAttribute('data-id');
+            if (placeId) {
+                window.location.href = `http://127.0.0.1:5001/places/${placeId}`;
+            }
+        });
 
-                placeCard.addEventListener('click', (e) => {
-                    e.stopPropagation();
-                    if (expandedCard && expandedCard !== placeCard) {
-                        collapseCardSmooth(expandedCard);
-                    }
+        placeCard.addEventListener('click', (e) => {
+            e.stopPropagation();
+            if (expandedCard && expandedCard !== placeCard) {
+                collapseCardSmooth(expandedCard);
+            }
 
-                    const isExpanding = !placeCard.classList.contains('expanded');
-                    const overlay = document.getElementById('overlay');
-                    if (isExpanding) {
-                        placeCard.classList.add('expanded');
-                        expandedCard = placeCard;
-                        if (overlay) {
-                            overlay.classList.add('active');
-                            overlay.style.pointerEvents = 'none';
-                        }
-                        document.body.style.overflow = 'hidden';
-                    } else {
-                        collapseCardSmooth(placeCard);
-                    }
-                });
+            const isExpanding = !placeCard.classList.contains('expanded');
+            const overlay = document.getElementById('overlay');
+            if (isExpanding) {
+                placeCard.classList.add('expanded');
+                expandedCard = placeCard;
+                if (overlay) {
+                    overlay.classList.add('active');
+                    overlay.style.pointerEvents = 'none';
+                }
+                document.body.style.overflow = 'hidden';
+            } else {
+                collapseCardSmooth(placeCard);
+            }
+        });
 
-                placesList.appendChild(placeCard);
-            });
+        return placeCard;
+    }
 
-            async function fetchAndDisplayCities() {
-                const placeCards = document.querySelectorAll('.place-card');
-                for (const card of placeCards) {
-                    const lat = card.dataset.lat;
-                    const lon = card.dataset.lon;
-                    if (!lat || !lon) {
-                        continue;
-                    }
+    async function fetchAndDisplayCities(placeCards) {
+        for (const card of placeCards) {
+            const lat = card.dataset.lat;
+            const lon = card.dataset.lon;
+            if (!lat || !lon) {
+                continue;
+            }
 
-                    const citySpan = card.querySelector('.city-placeholder');
-                    if (!citySpan) continue;
+            const citySpan = card.querySelector('.city-placeholder');
+            if (!citySpan) continue;
 
-                    try {
-                        const res = await fetch('/reverse-geocode', {
-                            method: 'POST',
-                            headers: { 'Content-Type': 'application/json' },
-                            body: JSON.stringify({ lat, lon }),
-                        });
+            try {
+                const res = await fetch('/reverse-geocode', {
+                    method: 'POST',
+                    headers: { 'Content-Type': 'application/json' },
+                    body: JSON.stringify({ lat, lon }),
+                });
 
-                        if (!res.ok) throw new Error('Network error');
+                if (!res.ok) throw new Error('Network error');
 
-                        const data = await res.json();
-                        const city = data.city || 'Unknown city';
-                        citySpan.textContent = city;
-                        card.dataset.location = city;
-                    } catch (err) {
-                        citySpan.textContent = 'Error';
-                        card.dataset.location = 'Error';
-                        console.error('Geocoding error:', err);
-                    }
-                }
+                const data = await res.json();
+                const city = data.city || 'Unknown city';
+                citySpan.textContent = city;
+                card.dataset.location = city;
+            } catch (err) {
+                citySpan.textContent = 'Error';
+                card.dataset.location = 'Error';
+                console.error('Geocoding error:', err);
             }
+        }
+    }
 
-            fetchAndDisplayCities().then(() => {
-                setupSearch();
-            });
-        })
-        .catch(err => {
-            placesList.innerHTML = '<p>An error occurred, can\'t display places.</p>';
-            console.error(err);
-        });
+    setupSearch();
+    loadPlaces();
 
     // Collapse on outside click
     document.addEventListener('click', (e) => {